@@ -0,0 +1 @@
+# Benchmarks del tablero, ejecutables sin Streamlit
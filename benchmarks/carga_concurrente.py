@@ -0,0 +1,189 @@
+# Prueba de carga local: N sesiones concurrentes interactuando con el tablero
+#
+# Cada sesión es un AppTest de Streamlit que ejecuta Analisis.py dentro de este proceso,
+# compartiendo las cachés de st.cache_resource y st.cache_data como en un servidor real.
+# AppTest vuelve a ejecutar el script completo en cada interacción (no aísla fragmentos),
+# así que las latencias medidas son una cota superior de las de un navegador.
+#
+# Uso: python -m benchmarks.carga_concurrente [--sesiones 8] [--interacciones 20] [--salida archivo.json]
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+
+from empresa.series import FRECUENCIAS, INDICADORES
+
+
+# Raíz del repositorio, donde están Analisis.py y Empresa.CSV
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Segundos entre muestras de memoria del proceso
+INTERVALO_MEMORIA = 0.5
+
+# Las cargas iniciales se serializan: compilar el script desde varios hilos a la vez
+# puede fallar en CPython 3.11 ("AST constructor recursion depth mismatch")
+CANDADO_INICIO = threading.Lock()
+
+
+def memoria_residente():
+    # Memoria residente actual del proceso en bytes (en Linux); si no, el máximo alcanzado
+    try:
+        with open('/proc/self/statm') as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo if sys.platform == 'darwin' else maximo * 1024
+
+
+def interactuar(app, rng):
+    # Aplicar una interacción realista al azar sobre los widgets del tablero
+    accion = rng.choice(['productos', 'mes', 'anio', 'serie', 'rango', 'envios'])
+    if accion == 'productos':
+        selector = app.multiselect[0]
+        elegidos = rng.sample(selector.options, rng.randint(0, 3))
+        selector.set_value(elegidos)
+    elif accion == 'mes':
+        selector = app.selectbox(key='fechas_mes')
+        selector.set_value(rng.choice(selector.options))
+    elif accion == 'anio':
+        selector = app.selectbox(key='fechas_anio')
+        selector.set_value(rng.choice(selector.options))
+    elif accion == 'serie':
+        # Los radios con format_func muestran etiquetas, pero se fijan con los valores originales
+        valores = {'fechas_vista': ['Mejores 50 fechas', 'Serie temporal'], 'fechas_frecuencia': list(FRECUENCIAS), 'fechas_indicador': list(INDICADORES)}
+        for clave, opciones in valores.items():
+            if clave in [radio.key for radio in app.radio]:
+                app.radio(key=clave).set_value(rng.choice(opciones))
+    elif accion == 'rango':
+        minimo = rng.choice([0, 0, 100, 500, 1000])
+        maximo = rng.choice([100_000, 100_000, 5000, 20_000])
+        app.slider[0].set_value((minimo, maximo))
+    else:
+        selector = app.selectbox(key=rng.choice(['envios_mes', 'envios_anio']))
+        selector.set_value(rng.choice(selector.options))
+    return accion
+
+
+def sesion(indice, interacciones, semilla, tiempo_maximo, latencias, errores):
+    # Simular una sesión: carga inicial y luego interacciones sucesivas
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(semilla + indice)
+    app = AppTest.from_file(os.path.join(RAIZ, 'Analisis.py'), default_timeout=tiempo_maximo)
+    for paso in range(interacciones + 1):
+        try:
+            accion = 'inicio' if paso == 0 else interactuar(app, rng)
+        except (KeyError, IndexError) as error:
+            # El widget no apareció en la última ejecución (por ejemplo, si se cortó por una excepción)
+            claves = [widget.key for widget in app.selectbox]
+            errores.append({'sesion': indice, 'accion': 'widget', 'error': f'{error!r}; selectores: {claves}'})
+            continue
+        inicio = time.perf_counter()
+        try:
+            if paso == 0:
+                with CANDADO_INICIO:
+                    inicio = time.perf_counter()
+                    app.run()
+            else:
+                app.run()
+        except Exception as error:  # Se registra y la sesión sigue con la siguiente interacción
+            errores.append({'sesion': indice, 'accion': accion, 'error': repr(error)})
+            continue
+        latencias.append({'sesion': indice, 'accion': accion, 'segundos': time.perf_counter() - inicio})
+        if app.exception:
+            errores.append({'sesion': indice, 'accion': accion, 'error': app.exception[0].message})
+
+
+def percentiles(valores):
+    if not valores:
+        return {}
+    return {f'p{p}': float(np.percentile(valores, p)) for p in (50, 95, 99)}
+
+
+def ejecutar(sesiones, interacciones, semilla=0, tiempo_maximo=120):
+    # Lanzar las sesiones en hilos, muestrear la memoria y resumir los resultados
+    latencias, errores, memoria = [], [], []
+    terminado = threading.Event()
+    inicio = time.perf_counter()
+
+    def muestrear():
+        while not terminado.is_set():
+            memoria.append({'segundo': time.perf_counter() - inicio, 'rss': memoria_residente()})
+            terminado.wait(INTERVALO_MEMORIA)
+
+    muestreo = threading.Thread(target=muestrear, daemon=True)
+    muestreo.start()
+    hilos = [
+        threading.Thread(target=sesion, args=(i, interacciones, semilla, tiempo_maximo, latencias, errores))
+        for i in range(sesiones)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+    terminado.set()
+    muestreo.join()
+
+    interactivas = [l['segundos'] for l in latencias if l['accion'] != 'inicio']
+    por_accion = {}
+    for latencia in latencias:
+        por_accion.setdefault(latencia['accion'], []).append(latencia['segundos'])
+    return {
+        'sesiones': sesiones,
+        'interacciones_por_sesion': interacciones,
+        'duracion': duracion,
+        'reejecuciones': len(latencias),
+        'reejecuciones_por_segundo': len(latencias) / duracion,
+        'latencia_inicio': percentiles([l['segundos'] for l in latencias if l['accion'] == 'inicio']),
+        'latencia_interacciones': percentiles(interactivas),
+        'latencia_por_accion': {accion: percentiles(valores) for accion, valores in por_accion.items()},
+        'rss_inicial': memoria[0]['rss'] if memoria else None,
+        'rss_maximo': max((m['rss'] for m in memoria), default=None),
+        'memoria': memoria,
+        'errores': errores,
+    }
+
+
+def imprimir(resultado):
+    print(f"{resultado['sesiones']} sesiones x {resultado['interacciones_por_sesion']} interacciones "
+          f"en {resultado['duracion']:.1f} s ({resultado['reejecuciones_por_segundo']:.2f} reejecuciones/s)")
+    for nombre in ('latencia_inicio', 'latencia_interacciones'):
+        valores = resultado[nombre]
+        if valores:
+            print(f"{nombre:<24}" + '  '.join(f'{clave}={valor * 1000:,.0f} ms' for clave, valor in valores.items()))
+    for accion, valores in sorted(resultado['latencia_por_accion'].items()):
+        print(f"  {accion:<22}" + '  '.join(f'{clave}={valor * 1000:,.0f} ms' for clave, valor in valores.items()))
+    if resultado['rss_maximo'] is not None:
+        print(f"RSS inicial {resultado['rss_inicial'] / 2**20:,.0f} MiB, máximo {resultado['rss_maximo'] / 2**20:,.0f} MiB")
+    if resultado['errores']:
+        print(f"{len(resultado['errores'])} errores; el primero: {resultado['errores'][0]['error']}")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga local con sesiones concurrentes del tablero.')
+    parser.add_argument('--sesiones', type=int, default=8)
+    parser.add_argument('--interacciones', type=int, default=20, help='interacciones por sesión después de la carga inicial')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--tiempo-maximo', type=float, default=120, help='segundos máximos por reejecución')
+    parser.add_argument('--salida', help='archivo JSON donde guardar el resultado completo')
+    opciones = parser.parse_args(argumentos)
+
+    # El tablero abre sus archivos con rutas relativas a la raíz del repositorio
+    os.chdir(RAIZ)
+    resultado = ejecutar(opciones.sesiones, opciones.interacciones, opciones.semilla, opciones.tiempo_maximo)
+    imprimir(resultado)
+    if opciones.salida:
+        with open(opciones.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+    return 1 if resultado['errores'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
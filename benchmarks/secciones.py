@@ -0,0 +1,185 @@
+# Benchmark sin Streamlit de los cálculos de cada sección del tablero
+#
+# Uso: python -m benchmarks.secciones [--filas 10000 100000 1000000 10000000] [--salida archivo.json]
+#                                     [--comparar anterior.json]
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.sinteticos import generar
+from empresa.cubo import CuboVentas
+from empresa.dispersion import MODO_REJILLA
+from empresa.distintos import DistintosPorGrupo
+from empresa.estadisticas import acumular_df, tabla_estadisticas
+from empresa.indices import IndiceFechas, IndiceProductos
+from empresa.ingesta import EstadoDatos
+from empresa.motores import MotorSQLite
+from empresa.secciones import clientes_por_region, top_fechas, top_productos, totales_envios, totales_region_provincia
+from empresa.series import INTERANUAL, MEDIA_MOVIL, MENSUAL, SEMANAL, SeriesTemporales
+
+
+# Tamaños de los conjuntos sintéticos por defecto
+FILAS_POR_DEFECTO = [10_000, 100_000, 1_000_000, 10_000_000]
+
+# Directorio donde se guardan los resultados si no se indica un archivo
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), 'resultados')
+
+
+def medir(funcion, reiniciar=None):
+    # Devolver el resultado de la función, el tiempo en segundos y el pico de memoria en bytes.
+    # tracemalloc hace más lenta cada asignación, así que el tiempo se mide en una ejecución sin
+    # rastreo y el pico en otra aparte; reiniciar deja el estado como antes de la primera
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    if reiniciar is not None:
+        reiniciar()
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, segundos, pico
+
+
+def pasos(df, directorio):
+    # Pasos del tablero en orden: primero las estructuras compartidas y luego cada sección. Los
+    # pasos que cambian el estado llevan además la función que lo restaura entre ejecuciones
+    estado = {}
+
+    def construir(nombre, funcion):
+        def paso():
+            estado[nombre] = funcion()
+        return paso
+
+    def productos_seleccionados():
+        # Los primeros cinco productos del selector, como una selección típica
+        return estado['indice_productos'].opciones[:5]
+
+    anio = int(df['Order Date'].dt.year.iloc[len(df) // 2]) if len(df) else None
+    # El último 1% de las filas llega como un lote nuevo sobre el estado construido con el resto
+    corte = len(df) - max(len(df) // 100, 1)
+    return [
+        ('construir_cubo', construir('cubo', lambda: CuboVentas.desde_df(df))),
+        ('construir_indice_fechas', construir('indice_fechas', lambda: IndiceFechas(df['Order Date']))),
+        ('construir_series', construir('series', lambda: SeriesTemporales.desde_df(df))),
+        ('construir_indice_productos', construir('indice_productos', lambda: IndiceProductos(df['Product Name']))),
+        ('construir_clientes', construir('clientes', lambda: DistintosPorGrupo.desde_df(df, ['Province', 'Region']))),
+        ('tabla_estadisticas', lambda: tabla_estadisticas(acumular_df(df, ['Sales', 'Profit']))),
+        ('top_productos', lambda: top_productos(estado['cubo'])),
+        ('top_productos_seleccion', lambda: top_productos(estado['cubo'], productos_seleccionados())),
+        ('filas_productos_seleccion', lambda: estado['indice_productos'].filas(df, productos_seleccionados())),
+        ('serie_fechas', lambda: top_fechas(estado['series'])),
+        ('serie_fechas_anio_mes', lambda: top_fechas(estado['series'], anio, 6)),
+        ('serie_semanal_media_movil', lambda: estado['series'].serie(SEMANAL, MEDIA_MOVIL)),
+        ('serie_mensual_interanual_anio', lambda: estado['series'].serie(MENSUAL, INTERANUAL, anio)),
+        ('clientes_por_region', lambda: clientes_por_region(estado['clientes'])),
+        ('region_provincia', lambda: totales_region_provincia(estado['cubo'], df, 0, 100_000)),
+        ('region_provincia_rango', lambda: totales_region_provincia(estado['cubo'], df, 100, 5_000)),
+        ('segmento_modo_envio', lambda: totales_envios(estado['cubo'])),
+        ('segmento_modo_envio_anio', lambda: totales_envios(estado['cubo'], anio)),
+        ('construir_estado_99pct', construir('estado', lambda: EstadoDatos(df.iloc[:corte]))),
+        ('agregar_lote_1pct', lambda: estado['estado'].agregar_lote(df.iloc[corte:]),
+         construir('estado', lambda: EstadoDatos(df.iloc[:corte]))),
+        # Las mismas consultas resueltas en SQLite con los filtros como predicados indexados
+        ('sqlite_construir', construir('sqlite', lambda: MotorSQLite(MotorSQLite.construir([df], os.path.join(directorio, 'pedidos.sqlite'))))),
+        ('sqlite_estadisticas', lambda: estado['sqlite'].estadisticas()),
+        ('sqlite_top_productos', lambda: estado['sqlite'].top_productos(())),
+        ('sqlite_top_productos_seleccion', lambda: estado['sqlite'].top_productos(productos_seleccionados())),
+        ('sqlite_dispersion_rejilla', lambda: estado['sqlite'].dispersion((), MODO_REJILLA)),
+        ('sqlite_serie_fechas_anio_mes', lambda: estado['sqlite'].top_fechas(anio, 6)),
+        ('sqlite_clientes_por_region', lambda: estado['sqlite'].clientes_por_region()),
+        ('sqlite_region_provincia_rango', lambda: estado['sqlite'].totales_region_provincia(100, 5_000)),
+        ('sqlite_segmento_modo_envio_anio', lambda: estado['sqlite'].totales_envios(anio, None)),
+    ]
+
+
+def ejecutar(filas, semilla=0):
+    # Generar un conjunto sintético y medir cada paso sobre él
+    df, segundos, pico = medir(lambda: generar(filas, semilla))
+    resultados = [{'seccion': 'generar_datos', 'segundos': segundos, 'memoria_pico': pico, 'filas_por_segundo': filas / segundos}]
+    directorio = tempfile.mkdtemp(prefix='empresa-benchmark-')
+    try:
+        for nombre, paso, *reiniciar in pasos(df, directorio):
+            _, segundos, pico = medir(paso, *reiniciar)
+            resultados.append({
+                'seccion': nombre,
+                'segundos': segundos,
+                'memoria_pico': pico,
+                'filas_por_segundo': filas / segundos if segundos else float('inf'),
+            })
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    return {'filas': filas, 'memoria_datos': int(df.memory_usage(deep=True).sum()), 'secciones': resultados}
+
+
+def entorno():
+    # Datos de la máquina y las versiones, para comparar corridas entre sí
+    return {
+        'fecha': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'procesadores': os.cpu_count(),
+    }
+
+
+def imprimir(corrida, anterior=None):
+    # Mostrar una tabla por tamaño; con una corrida anterior se agrega la relación de tiempos
+    previas = {}
+    for tamano in (anterior or {}).get('corridas', []):
+        for seccion in tamano['secciones']:
+            previas[(tamano['filas'], seccion['seccion'])] = seccion['segundos']
+    for tamano in corrida['corridas']:
+        print(f"\n{tamano['filas']:,} filas ({tamano['memoria_datos'] / 2**20:,.1f} MiB en memoria)")
+        print(f"{'sección':<34}{'segundos':>12}{'pico MiB':>12}{'filas/s':>16}{'vs anterior':>14}")
+        for seccion in tamano['secciones']:
+            previo = previas.get((tamano['filas'], seccion['seccion']))
+            relacion = f"{seccion['segundos'] / previo:>13.2f}x" if previo else f"{'-':>14}"
+            print(f"{seccion['seccion']:<34}{seccion['segundos']:>12.4f}{seccion['memoria_pico'] / 2**20:>12.1f}"
+                  f"{seccion['filas_por_segundo']:>16,.0f}{relacion}")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Benchmark sin Streamlit de las secciones del tablero.')
+    parser.add_argument('--filas', type=int, nargs='+', default=FILAS_POR_DEFECTO, help='tamaños de los conjuntos sintéticos')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help='archivo JSON de resultados (por defecto benchmarks/resultados/<fecha>.json)')
+    parser.add_argument('--comparar', help='archivo JSON de una corrida anterior para comparar tiempos')
+    opciones = parser.parse_args(argumentos)
+
+    corrida = {'entorno': entorno(), 'corridas': []}
+    for filas in opciones.filas:
+        print(f'Midiendo {filas:,} filas...', file=sys.stderr)
+        corrida['corridas'].append(ejecutar(filas, opciones.semilla))
+
+    salida = opciones.salida
+    if salida is None:
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        marca = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        salida = os.path.join(DIRECTORIO_RESULTADOS, f'{marca}.json')
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(corrida, archivo, indent=2, ensure_ascii=False)
+
+    anterior = None
+    if opciones.comparar:
+        with open(opciones.comparar, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+    imprimir(corrida, anterior)
+    print(f'\nResultados guardados en {salida}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
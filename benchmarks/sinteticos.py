@@ -0,0 +1,106 @@
+# Generador de conjuntos de datos sintéticos con el mismo esquema que Empresa.CSV
+import numpy as np
+import pandas as pd
+
+from empresa.carga import FORMATO_FECHA, normalizar
+
+
+# Columnas del CSV en su orden original (la columna sin nombre es el contenedor del producto)
+COLUMNAS = [
+    'Row ID', 'Order ID', 'Order Date', 'Order Priority', 'Order Quantity', 'Sales', 'Discount',
+    'Ship Mode', 'Profit', 'Unit Price', 'Shipping Cost', 'Customer Name', 'Province', 'Region',
+    'Customer Segment', 'Product Category', 'Product Sub-Category', 'Product Name', 'Product Container',
+    'Product Base Margin', 'Ship Date',
+]
+
+# Provincias de cada región, como en los datos reales
+REGIONES = {
+    'Atlantic': ['New Brunswick', 'Newfoundland', 'Nova Scotia', 'Prince Edward Island'],
+    'Northwest Territories': ['Northwest Territories'],
+    'Nunavut': ['Nunavut'],
+    'Ontario': ['Ontario'],
+    'Prarie': ['Manitoba', 'Saskachewan'],
+    'Quebec': ['Quebec'],
+    'West': ['Alberta', 'British Columbia'],
+    'Yukon': ['Yukon'],
+}
+
+# Subcategorías de cada categoría de producto
+CATEGORIAS = {
+    'Furniture': ['Bookcases', 'Chairs & Chairmats', 'Office Furnishings', 'Tables'],
+    'Office Supplies': [
+        'Appliances', 'Binders and Binder Accessories', 'Envelopes', 'Labels', 'Paper',
+        'Pens & Art Supplies', 'Rubber Bands', 'Scissors, Rulers and Trimmers', 'Storage & Organization',
+    ],
+    'Technology': ['Computer Peripherals', 'Copiers and Fax', 'Office Machines', 'Telephones and Communication'],
+}
+
+PRIORIDADES = ['Critical', 'High', 'Low', 'Medium', 'Not Specified']
+MODOS_ENVIO = ['Delivery Truck', 'Express Air', 'Regular Air']
+SEGMENTOS = ['Consumer', 'Corporate', 'Home Office', 'Small Business']
+CONTENEDORES = ['Jumbo Box', 'Jumbo Drum', 'Large Box', 'Medium Box', 'Small Box', 'Small Pack', 'Wrap Bag']
+
+# Rango de fechas de pedido generadas
+FECHA_INICIO = '2009-01-01'
+FECHA_FIN = '2012-12-31'
+
+
+def generar(filas, semilla=0):
+    # Generar un DataFrame tipado como el que devuelve empresa.carga.cargar_datos
+    rng = np.random.default_rng(semilla)
+
+    # El catálogo de productos y clientes crece con la cantidad de filas
+    productos = max(100, min(50_000, filas // 20))
+    clientes = max(100, filas // 10)
+
+    provincias = [(region, provincia) for region, lista in REGIONES.items() for provincia in lista]
+    subcategorias = [(categoria, sub) for categoria, lista in CATEGORIAS.items() for sub in lista]
+    eleccion_provincia = rng.integers(len(provincias), size=filas)
+    eleccion_producto = rng.integers(productos, size=filas)
+    subcategoria_producto = np.arange(productos) % len(subcategorias)
+
+    inicio = np.datetime64(FECHA_INICIO, 'D')
+    dias = (np.datetime64(FECHA_FIN, 'D') - inicio).astype(int) + 1
+    fechas = inicio + rng.integers(dias, size=filas).astype('timedelta64[D]')
+
+    cantidad = rng.integers(1, 51, size=filas)
+    precio = np.round(rng.lognormal(3.0, 1.4, size=filas), 2)
+    descuento = np.round(rng.uniform(0, 0.25, size=filas), 2)
+    ventas = np.round(cantidad * precio * (1 - descuento) + rng.normal(0, 5, size=filas).clip(-1, None), 2)
+    ganancia = np.round(ventas * rng.normal(0.05, 0.4, size=filas), 2)
+
+    nombres_producto = np.array([f'{subcategorias[s][1]} {i:05d}' for i, s in enumerate(subcategoria_producto)], dtype=object)
+    nombres_cliente = np.array([f'Cliente {i:07d}' for i in range(clientes)], dtype=object)
+    margen = np.round(rng.uniform(0.35, 0.85, size=filas), 2)
+    margen[rng.random(filas) < 0.0075] = np.nan
+
+    df = pd.DataFrame({
+        'Row ID': np.arange(1, filas + 1),
+        'Order ID': rng.integers(1, max(2, filas // 2), size=filas),
+        'Order Date': fechas,
+        'Order Priority': np.array(PRIORIDADES, dtype=object)[rng.integers(len(PRIORIDADES), size=filas)],
+        'Order Quantity': cantidad,
+        'Sales': ventas,
+        'Discount': descuento,
+        'Ship Mode': np.array(MODOS_ENVIO, dtype=object)[rng.integers(len(MODOS_ENVIO), size=filas)],
+        'Profit': ganancia,
+        'Unit Price': precio,
+        'Shipping Cost': np.round(rng.lognormal(1.8, 0.9, size=filas), 2),
+        'Customer Name': nombres_cliente[rng.integers(clientes, size=filas)],
+        'Province': np.array([p for _, p in provincias], dtype=object)[eleccion_provincia],
+        'Region': np.array([r for r, _ in provincias], dtype=object)[eleccion_provincia],
+        'Customer Segment': np.array(SEGMENTOS, dtype=object)[rng.integers(len(SEGMENTOS), size=filas)],
+        'Product Category': np.array([c for c, _ in subcategorias], dtype=object)[subcategoria_producto[eleccion_producto]],
+        'Product Sub-Category': np.array([s for _, s in subcategorias], dtype=object)[subcategoria_producto[eleccion_producto]],
+        'Product Name': nombres_producto[eleccion_producto],
+        'Product Container': np.array(CONTENEDORES, dtype=object)[rng.integers(len(CONTENEDORES), size=filas)],
+        'Product Base Margin': margen,
+        'Ship Date': fechas + rng.integers(0, 8, size=filas).astype('timedelta64[D]'),
+    })
+    return normalizar(df[COLUMNAS])
+
+
+def escribir_csv(df, ruta):
+    # Escribir el DataFrame con el formato de Empresa.CSV (fechas m/d/a y columna sin nombre)
+    salida = df.rename(columns={'Product Container': ''})
+    salida.to_csv(ruta, index=False, date_format=FORMATO_FECHA, encoding='utf-8')
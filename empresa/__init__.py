@@ -0,0 +1 @@
+# Paquete con la lógica de datos del tablero de Análisis Empresarial
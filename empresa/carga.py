@@ -0,0 +1,195 @@
+# Carga tipada y columnar del archivo Empresa.CSV
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # El sidecar Parquet es opcional
+    pa = None
+    pq = None
+
+
+# Formato fijo de las fechas del CSV (mes/día/año)
+FORMATO_FECHA = '%m/%d/%Y'
+
+# Columnas de fecha que se parsean una sola vez durante la carga
+COLUMNAS_FECHA = ['Order Date', 'Ship Date']
+
+# Esquema explícito de las columnas del CSV
+ESQUEMA = {
+    'Row ID': 'int64',
+    'Order ID': 'int64',
+    'Order Priority': 'category',
+    'Order Quantity': 'int32',
+    'Sales': 'float64',
+    'Discount': 'float32',
+    'Ship Mode': 'category',
+    'Profit': 'float64',
+    'Unit Price': 'float32',
+    'Shipping Cost': 'float64',
+    'Customer Name': 'string',
+    'Province': 'category',
+    'Region': 'category',
+    'Customer Segment': 'category',
+    'Product Category': 'category',
+    'Product Sub-Category': 'category',
+    'Product Name': 'category',
+    'Product Container': 'category',
+    'Product Base Margin': 'float32',
+}
+
+# La columna del contenedor del producto viene sin nombre en el CSV
+COLUMNA_SIN_NOMBRE = 'Unnamed: 18'
+
+# Versión del formato del sidecar; cambiarla invalida los archivos existentes
+VERSION_SIDECAR = 3
+
+# Clave de los metadatos del sidecar dentro del archivo Parquet
+CLAVE_METADATOS = b'empresa.origen'
+
+
+def huella_archivo(ruta):
+    # Calcular el hash SHA-256 del contenido del archivo
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def firma_archivo(ruta):
+    # Tamaño y fechas de modificación del contenido y del inodo en nanosegundos; la segunda cambia
+    # con cualquier escritura aunque después se restaure la fecha de modificación
+    estado = os.stat(ruta)
+    return {'tamano': estado.st_size, 'mtime_ns': estado.st_mtime_ns, 'ctime_ns': estado.st_ctime_ns}
+
+
+def origen_archivo(ruta):
+    # Identificar la versión de un archivo por su firma y su contenido
+    return {**firma_archivo(ruta), 'sha256': huella_archivo(ruta)}
+
+
+def verificar_origen(guardado, ruta):
+    # Comprobar que los metadatos guardados de un archivo derivado siguen correspondiendo al archivo.
+    # Si la firma coincide se aceptan sin leer el archivo; si no, el contenido tiene que tener el
+    # mismo hash. Devuelve None si no corresponden, o los metadatos a guardar: los mismos, o con la
+    # firma nueva si sólo cambió la fecha, para que la próxima vez no haga falta volver a calcular el hash
+    firma = firma_archivo(ruta)
+    if all(guardado.get(clave) == valor for clave, valor in firma.items()):
+        return guardado
+    if guardado.get('sha256') != huella_archivo(ruta):
+        return None
+    return {**guardado, **firma}
+
+
+def ruta_sidecar(ruta_csv):
+    # El sidecar vive junto al CSV con extensión .parquet
+    return os.path.splitext(ruta_csv)[0] + '.parquet'
+
+
+def leer_csv(ruta, **kwargs):
+    # Leer el CSV aplicando el esquema y parseando las fechas con formato fijo
+    df = pd.read_csv(ruta, encoding='utf-8', **kwargs)
+    return normalizar(df)
+
+
+def normalizar(df):
+    # Aplicar nombres, tipos y orden estables a un DataFrame crudo
+    df = df.rename(columns={COLUMNA_SIN_NOMBRE: 'Product Container'})
+    for columna in COLUMNAS_FECHA:
+        if columna in df.columns and not pd.api.types.is_datetime64_any_dtype(df[columna]):
+            df[columna] = pd.to_datetime(df[columna], format=FORMATO_FECHA)
+    tipos = {columna: tipo for columna, tipo in ESQUEMA.items() if columna in df.columns}
+    df = df.astype(tipos)
+
+    # Ordenar físicamente las filas por fecha de pedido, para que cada año sea un rango contiguo
+    if 'Order Date' in df.columns and not df['Order Date'].is_monotonic_increasing:
+        df = df.sort_values('Order Date', kind='stable')
+    return df.reset_index(drop=True)
+
+
+def alinear_categorias(*marcos):
+    # Dar las mismas categorías a las columnas categóricas de varios DataFrames; las categorías
+    # nuevas se agregan al final para que los códigos del primero no cambien
+    primero = marcos[0]
+    cambios = [{} for _ in marcos]
+    for columna in primero.columns:
+        if not isinstance(primero[columna].dtype, pd.CategoricalDtype):
+            continue
+        categorias = primero[columna].cat.categories
+        for marco in marcos[1:]:
+            categorias = categorias.append(marco[columna].cat.categories.difference(categorias))
+        for marco, cambio in zip(marcos, cambios):
+            propias = marco[columna].cat.categories
+            if propias.equals(categorias):
+                continue
+            # Si sólo faltan categorías al final se agregan sin recodificar la columna
+            if propias.equals(categorias[:len(propias)]):
+                cambio[columna] = marco[columna].cat.add_categories(categorias[len(propias):])
+            else:
+                cambio[columna] = marco[columna].astype(pd.CategoricalDtype(categorias))
+    return [marco.assign(**cambio) if cambio else marco for marco, cambio in zip(marcos, cambios)]
+
+
+def _metadatos_origen(ruta_csv):
+    return {'version': VERSION_SIDECAR, **origen_archivo(ruta_csv)}
+
+
+def _leer_sidecar(ruta_csv, ruta_parquet):
+    # Devolver el sidecar si sigue correspondiendo al CSV, si no None
+    if pq is None or not os.path.exists(ruta_parquet):
+        return None
+    try:
+        metadatos = pq.read_schema(ruta_parquet).metadata or {}
+        origen = json.loads(metadatos.get(CLAVE_METADATOS, b'{}'))
+    except (OSError, ValueError, pa.ArrowException):
+        return None
+    if origen.get('version') != VERSION_SIDECAR:
+        return None
+    vigente = verificar_origen(origen, ruta_csv)
+    if vigente is None:
+        return None
+    if vigente != origen:
+        # El CSV sólo cambió de fecha: guardar la firma nueva; si no se puede, se vuelve a comparar el hash
+        try:
+            _guardar_tabla(pq.read_table(ruta_parquet), vigente, ruta_parquet)
+        except (OSError, pa.ArrowException):
+            pass
+    return pd.read_parquet(ruta_parquet)
+
+
+def _guardar_tabla(tabla, origen, ruta_parquet):
+    # Escribir la tabla con los metadatos de origen; se escribe aparte y se reemplaza de una vez
+    metadatos = dict(tabla.schema.metadata or {})
+    metadatos[CLAVE_METADATOS] = json.dumps(origen).encode('utf-8')
+    temporal = ruta_parquet + '.tmp'
+    pq.write_table(tabla.replace_schema_metadata(metadatos), temporal)
+    os.replace(temporal, ruta_parquet)
+
+
+def _escribir_sidecar(df, ruta_csv, ruta_parquet):
+    # Guardar el DataFrame tipado en Parquet junto con la huella del CSV
+    _guardar_tabla(pa.Table.from_pandas(df, preserve_index=False), _metadatos_origen(ruta_csv), ruta_parquet)
+
+
+def cargar_datos(ruta_csv, usar_sidecar=True):
+    # Cargar el conjunto de datos desde el sidecar Parquet o, si está desactualizado, desde el CSV
+    ruta_parquet = ruta_sidecar(ruta_csv)
+    if usar_sidecar:
+        df = _leer_sidecar(ruta_csv, ruta_parquet)
+        if df is not None:
+            return df
+
+    df = leer_csv(ruta_csv)
+
+    # Reconstruir el sidecar; si el directorio no es escribible se sigue sin él
+    if usar_sidecar and pa is not None:
+        try:
+            _escribir_sidecar(df, ruta_csv, ruta_parquet)
+        except OSError:
+            pass
+    return df
@@ -0,0 +1,106 @@
+# Conjunto de datos de sólo lectura compartido por todas las sesiones del proceso
+#
+# Las columnas se guardan una sola vez como arreglos inmutables (los buffers de numpy quedan
+# con WRITEABLE=False, igual que el arreglo base del que son vista) y cada sesión recibe un
+# DataFrame nuevo construido sobre esos mismos buffers, sin copiarlos. Una sesión puede
+# agregar, quitar o renombrar columnas de su vista sin afectar a las demás, pero cualquier
+# escritura sobre los valores compartidos (df.loc[...] = ..., df.at[...] = ...) falla porque
+# sus buffers son de sólo lectura. Los filtros por filas (take, iloc, máscaras) sólo copian
+# las filas elegidas.
+#
+# anexar() devuelve otros datos con filas agregadas al final sin copiar las existentes: las
+# filas nuevas quedan como otra parte de cada columna, y las partes de una columna se unen en
+# un solo arreglo (también inmutable) la primera vez que alguien pide esa columna.
+import threading
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+def _buffers(arreglo):
+    # Arreglos de numpy que respaldan una columna: valores, fechas o códigos de categoría
+    for buffer in (arreglo, getattr(arreglo, '_ndarray', None), getattr(arreglo, '_codes', None)):
+        if isinstance(buffer, np.ndarray):
+            yield buffer
+
+
+def congelar(arreglo):
+    # Marcar como sólo lectura los buffers de una columna y los arreglos base de los que son vista,
+    # para que nadie pueda volver a habilitar la escritura sobre ellos
+    for buffer in _buffers(arreglo):
+        while isinstance(buffer, np.ndarray):
+            buffer.flags.writeable = False
+            buffer = buffer.base
+    return arreglo
+
+
+def _unir(partes):
+    # Unir las partes de una columna. Las categorías quedan ordenadas como en una columna cargada de
+    # una vez; los códigos sólo se recalculan si alguna parte trae categorías nuevas
+    if isinstance(partes[0].dtype, pd.CategoricalDtype):
+        unida = union_categoricals(list(partes))
+        if not unida.categories.is_monotonic_increasing:
+            unida = unida.reorder_categories(unida.categories.sort_values())
+        return unida
+    return pd.concat([pd.Series(parte, copy=False) for parte in partes], ignore_index=True).array
+
+
+class DatosCompartidos:
+    # Columnas inmutables del conjunto de datos y vistas sin copia para cada sesión
+
+    def __init__(self, columnas):
+        columnas = {nombre: congelar(arreglo) for nombre, arreglo in columnas.items()}
+        largos = {len(arreglo) for arreglo in columnas.values()}
+        if len(largos) > 1:
+            raise ValueError('Todas las columnas deben tener la misma cantidad de filas')
+        self._iniciar({nombre: (arreglo,) for nombre, arreglo in columnas.items()}, largos.pop() if largos else 0)
+
+    def _iniciar(self, partes, filas):
+        object.__setattr__(self, 'nombres', tuple(partes))
+        object.__setattr__(self, 'filas', filas)
+        object.__setattr__(self, '_partes', partes)
+        object.__setattr__(self, '_candado', threading.Lock())
+
+    @classmethod
+    def desde_df(cls, df):
+        # Tomar las columnas del DataFrame sin copiarlas; el DataFrame original no debe seguir usándose
+        return cls({nombre: df[nombre].array for nombre in df.columns})
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError('Los datos compartidos son de sólo lectura')
+
+    def __delattr__(self, nombre):
+        raise AttributeError('Los datos compartidos son de sólo lectura')
+
+    def __len__(self):
+        return self.filas
+
+    @property
+    def columnas(self):
+        return MappingProxyType({nombre: self.columna(nombre) for nombre in self.nombres})
+
+    def columna(self, nombre):
+        # Arreglo completo de una columna, uniendo sus partes la primera vez que se pide
+        partes = self._partes[nombre]
+        if len(partes) > 1:
+            with self._candado:
+                partes = self._partes[nombre]
+                if len(partes) > 1:
+                    partes = self._partes[nombre] = (congelar(_unir(partes)),)
+        return partes[0]
+
+    def anexar(self, df):
+        # Datos con las filas del DataFrame agregadas al final; éstos no cambian y sus columnas no se copian
+        nuevos = DatosCompartidos.desde_df(df[list(self.nombres)])
+        datos = DatosCompartidos.__new__(DatosCompartidos)
+        datos._iniciar({nombre: self._partes[nombre] + nuevos._partes[nombre] for nombre in self.nombres},
+                       self.filas + nuevos.filas)
+        return datos
+
+    def vista(self, columnas=None):
+        # DataFrame propio de quien lo pide, respaldado por los buffers compartidos
+        nombres = self.nombres if columnas is None else list(columnas)
+        return pd.DataFrame({nombre: self.columna(nombre) for nombre in nombres}, copy=False)
+
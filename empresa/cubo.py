@@ -0,0 +1,127 @@
+# Cubo de sumas parciales pre-agregadas para las secciones del tablero
+import threading
+
+import numpy as np
+import pandas as pd
+
+from empresa.carga import alinear_categorias
+
+
+# Dimensiones que forman la clave de cada celda del cubo
+DIMENSIONES = ['Year', 'Month', 'Region', 'Province', 'Customer Segment', 'Ship Mode', 'Product Name']
+
+# Medidas aditivas que se acumulan en cada celda
+MEDIDAS = ['Sales', 'Profit', 'Order Quantity', 'Shipping Cost']
+
+# Columna con la cantidad de filas originales de cada celda
+FILAS = 'Rows'
+
+# Fracción de celdas agregadas sin reagrupar a partir de la cual se compacta el cubo
+FRACCION_COMPACTAR = 0.1
+
+
+class CuboVentas:
+    # Cubo en memoria con las sumas de las medidas por combinación de dimensiones
+
+    def __init__(self, celdas, rangos):
+        # Partes de la tabla de celdas: las agregadas con agregar() se guardan aparte y se unen en
+        # una sola tabla la primera vez que se leen las celdas
+        self._partes = [celdas]
+        self._candado = threading.Lock()
+        # Celdas agregadas al final desde la última compactación; pueden repetir claves
+        self.pendientes = 0
+        # Mínimo y máximo por fila de cada medida, para saber si un filtro de rango cubre todo
+        self.rangos = rangos
+
+    @classmethod
+    def desde_df(cls, df):
+        # Construir el cubo a partir del DataFrame de pedidos
+        claves = df[DIMENSIONES[2:]].copy()
+        claves.insert(0, 'Year', df['Order Date'].dt.year.astype('int16'))
+        claves.insert(1, 'Month', df['Order Date'].dt.month.astype('int8'))
+        valores = pd.concat([claves, df[MEDIDAS]], axis=1)
+        valores[FILAS] = 1
+        celdas = valores.groupby(DIMENSIONES, observed=True, sort=False)[MEDIDAS + [FILAS]].sum().reset_index()
+        rangos = {medida: (df[medida].min(), df[medida].max()) for medida in MEDIDAS}
+        return cls(celdas, rangos)
+
+    def __len__(self):
+        return sum(len(parte) for parte in self._partes)
+
+    @property
+    def celdas(self):
+        # Unir las partes pendientes con las mismas categorías; si dos lectores coinciden, ambos
+        # producen la misma tabla
+        partes = self._partes
+        if len(partes) > 1:
+            with self._candado:
+                if len(self._partes) > 1:
+                    celdas = pd.concat(alinear_categorias(*self._partes), ignore_index=True)
+                    # Con categorías nuevas se ordenan como en un cubo construido de una vez
+                    for columna in celdas.select_dtypes('category'):
+                        categorias = celdas[columna].cat.categories
+                        if not categorias.is_monotonic_increasing:
+                            celdas[columna] = celdas[columna].cat.reorder_categories(categorias.sort_values())
+                    self._partes = [celdas]
+                partes = self._partes
+        return partes[0]
+
+    def copia(self):
+        # Copia que comparte las celdas existentes, que nunca se modifican: agregar() sólo suma partes
+        nuevo = CuboVentas(None, dict(self.rangos))
+        nuevo._partes = list(self._partes)
+        nuevo.pendientes = self.pendientes
+        return nuevo
+
+    def agregar(self, df):
+        # Sumar filas nuevas sin volver a recorrer los pedidos anteriores: sus celdas se agregan al
+        # final como una parte más (las consultas suman igual las claves repetidas) y se reagrupa
+        # todo sólo cuando las celdas pendientes superan FRACCION_COMPACTAR del cubo
+        if not len(df):
+            return self
+        nuevo = CuboVentas.desde_df(df)
+        self._partes = self._partes + nuevo._partes
+        self.pendientes += len(nuevo)
+        if self.pendientes > FRACCION_COMPACTAR * len(self):
+            self.compactar()
+        self.rangos = {
+            medida: (min(bajo, nuevo.rangos[medida][0]), max(alto, nuevo.rangos[medida][1]))
+            for medida, (bajo, alto) in self.rangos.items()
+        }
+        return self
+
+    def compactar(self):
+        # Reagrupar las celdas para que cada combinación de dimensiones aparezca una sola vez
+        self._partes = [self.celdas.groupby(DIMENSIONES, observed=True, sort=False)[MEDIDAS + [FILAS]].sum().reset_index()]
+        self.pendientes = 0
+        return self
+
+    def cubre_rango(self, medida, minimo, maximo):
+        # Indicar si el rango [minimo, maximo] incluye todas las filas de la medida
+        bajo, alto = self.rangos[medida]
+        return minimo <= bajo and alto <= maximo
+
+    def _mascara(self, celdas, filtros):
+        # Combinar los filtros {dimensión: valor o lista de valores}; None no filtra
+        mascara = np.ones(len(celdas), dtype=bool)
+        for dimension, valores in (filtros or {}).items():
+            if valores is None:
+                continue
+            columna = celdas[dimension]
+            if np.isscalar(valores):
+                mascara &= (columna == valores).to_numpy()
+            else:
+                mascara &= columna.isin(valores).to_numpy()
+        return mascara
+
+    def consultar(self, por, medidas=None, filtros=None):
+        # Sumar las medidas agrupando por las dimensiones indicadas sobre las celdas filtradas
+        por = [por] if isinstance(por, str) else list(por)
+        medidas = MEDIDAS if medidas is None else ([medidas] if isinstance(medidas, str) else list(medidas))
+        celdas = self.celdas
+        mascara = self._mascara(celdas, filtros)
+        if not mascara.all():
+            celdas = celdas[mascara]
+        if not por:
+            return celdas[medidas].sum()
+        return celdas.groupby(por, observed=True)[medidas].sum().reset_index()
@@ -0,0 +1,78 @@
+# Reducción del gráfico de dispersión de ventas y ganancias antes de enviarlo al navegador
+import numpy as np
+import pandas as pd
+
+
+# Columnas que usan la codificación y el tooltip del gráfico de dispersión
+COLUMNAS_DISPERSION = ['Sales', 'Profit', 'Product Name', 'Order Date']
+
+# Cantidad de filas a partir de la cual se deja de enviar cada pedido
+UMBRAL_FILAS = 10_000
+
+# Cantidad de celdas por eje en el modo rejilla
+CELDAS_REJILLA = 80
+
+# Modos de reducción disponibles
+MODO_REJILLA = 'rejilla'
+MODO_MUESTRA = 'muestra'
+
+
+def preparar_dispersion(df, umbral=UMBRAL_FILAS, modo=MODO_REJILLA, celdas=CELDAS_REJILLA, semilla=0):
+    # Devolver los datos del gráfico y si están agregados en una rejilla
+    if len(df) <= umbral:
+        return df[COLUMNAS_DISPERSION], False
+    if modo == MODO_MUESTRA:
+        return muestra_estratificada(df, umbral, semilla), False
+    if modo == MODO_REJILLA:
+        return agrupar_en_rejilla(df, celdas), True
+    raise ValueError(f"Modo de dispersión desconocido: {modo!r}")
+
+
+def _celda(valores, celdas):
+    # Asignar cada valor a una de las celdas de igual ancho entre el mínimo y el máximo
+    minimo, maximo = valores.min(), valores.max()
+    ancho = (maximo - minimo) / celdas or 1.0
+    return np.clip(((valores - minimo) / ancho).astype(np.int64), 0, celdas - 1)
+
+
+def agrupar_en_rejilla(df, celdas=CELDAS_REJILLA):
+    # Agrupar los pedidos en una rejilla 2D de ventas x ganancias con conteos y sumas
+    ventas = df['Sales'].to_numpy(dtype=np.float64)
+    ganancias = df['Profit'].to_numpy(dtype=np.float64)
+    clave = _celda(ventas, celdas) * celdas + _celda(ganancias, celdas)
+
+    # Sumar por celda con bincount y quedarse sólo con las celdas ocupadas
+    filas = np.bincount(clave, minlength=celdas * celdas)
+    suma_ventas = np.bincount(clave, weights=ventas, minlength=celdas * celdas)
+    suma_ganancias = np.bincount(clave, weights=ganancias, minlength=celdas * celdas)
+    ocupadas = filas > 0
+
+    # Cada punto se ubica en el promedio de los pedidos de su celda
+    return pd.DataFrame({
+        'Sales': suma_ventas[ocupadas] / filas[ocupadas],
+        'Profit': suma_ganancias[ocupadas] / filas[ocupadas],
+        'Rows': filas[ocupadas],
+        'Total Sales': suma_ventas[ocupadas],
+        'Total Profit': suma_ganancias[ocupadas],
+    })
+
+
+def muestra_estratificada(df, tamano=UMBRAL_FILAS, semilla=0):
+    # Muestrear por producto conservando siempre los valores extremos de ventas y ganancias
+    datos = df[COLUMNAS_DISPERSION].reset_index(drop=True)
+
+    # Reservar una parte del tamaño para los extremos de cada eje
+    extremos = max(1, tamano // 20)
+    posiciones = []
+    for columna in ('Sales', 'Profit'):
+        valores = datos[columna].to_numpy()
+        k = min(extremos, len(valores) - 1)
+        posiciones.append(np.argpartition(valores, k)[:k])
+        posiciones.append(np.argpartition(-valores, k)[:k])
+    atipicos = np.unique(np.concatenate(posiciones))
+
+    # Completar con una muestra proporcional dentro de cada producto
+    resto = datos.drop(index=atipicos)
+    fraccion = min(1.0, max(0, tamano - len(atipicos)) / max(1, len(resto)))
+    muestra = resto.groupby('Product Name', observed=True, group_keys=False).sample(frac=fraccion, random_state=semilla)
+    return pd.concat([datos.iloc[atipicos], muestra]).sort_index()
@@ -0,0 +1,178 @@
+# Conteo de clientes distintos con conjuntos exactos o HyperLogLog fusionables
+#
+# Cada grupo (por ejemplo una provincia) guarda un conjunto de clientes en lugar de un
+# número, de modo que los totales por región y el total global se obtienen uniendo
+# conjuntos: un cliente que compra en varias provincias se cuenta una sola vez.
+import numpy as np
+import pandas as pd
+
+
+# Modos de conteo
+MODO_EXACTO = 'exacto'
+MODO_HLL = 'hll'
+MODO_AUTO = 'auto'
+
+# Cantidad de filas hasta la que el modo 'auto' usa conjuntos exactos
+LIMITE_EXACTO = 1_000_000
+
+# Precisión por defecto de HyperLogLog: 2^14 registros, error estándar ~0,8%
+PRECISION_HLL = 14
+
+
+class ConjuntoExacto:
+    # Mapa de bits sobre los códigos de diccionario de los clientes
+
+    def __init__(self, tamano):
+        self.palabras = np.zeros((tamano + 63) // 64, dtype=np.uint64)
+
+    def agregar(self, codigos):
+        codigos = np.asarray(codigos, dtype=np.uint64)
+        # Ampliar el mapa si llegan códigos nuevos del diccionario
+        if len(codigos) and int(codigos.max()) >= 64 * len(self.palabras):
+            self.palabras = np.concatenate([self.palabras, np.zeros(int(codigos.max()) // 64 + 1 - len(self.palabras), dtype=np.uint64)])
+        np.bitwise_or.at(self.palabras, codigos >> np.uint64(6), np.uint64(1) << (codigos & np.uint64(63)))
+        return self
+
+    def fusionar(self, otro):
+        if len(otro.palabras) > len(self.palabras):
+            self.palabras = np.concatenate([self.palabras, np.zeros(len(otro.palabras) - len(self.palabras), dtype=np.uint64)])
+        self.palabras[:len(otro.palabras)] |= otro.palabras
+        return self
+
+    def copia(self):
+        nuevo = ConjuntoExacto(0)
+        nuevo.palabras = self.palabras.copy()
+        return nuevo
+
+    def contar(self):
+        return int(np.unpackbits(self.palabras.view(np.uint8)).sum())
+
+
+def _ceros_iniciales(valores):
+    # Contar los ceros a la izquierda de enteros de 64 bits por búsqueda binaria vectorizada
+    valores = valores.copy()
+    ceros = np.zeros(len(valores), dtype=np.uint8)
+    for desplazamiento in (32, 16, 8, 4, 2, 1):
+        cortos = valores < (np.uint64(1) << np.uint64(64 - desplazamiento))
+        ceros[cortos] += desplazamiento
+        valores[cortos] <<= np.uint64(desplazamiento)
+    ceros[valores == 0] = 64
+    return ceros
+
+
+class HyperLogLog:
+    # Sketch HyperLogLog sobre hashes de 64 bits; la unión es el máximo por registro
+
+    def __init__(self, precision=PRECISION_HLL):
+        self.precision = precision
+        self.registros = np.zeros(1 << precision, dtype=np.uint8)
+
+    def agregar(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        indices = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        resto = hashes << np.uint64(self.precision)
+        rangos = np.minimum(_ceros_iniciales(resto), 64 - self.precision) + 1
+        np.maximum.at(self.registros, indices, rangos.astype(np.uint8))
+        return self
+
+    def fusionar(self, otro):
+        if otro.precision != self.precision:
+            raise ValueError('Sólo se pueden fusionar sketches con la misma precisión')
+        np.maximum(self.registros, otro.registros, out=self.registros)
+        return self
+
+    def copia(self):
+        nuevo = HyperLogLog(self.precision)
+        nuevo.registros = self.registros.copy()
+        return nuevo
+
+    def contar(self):
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimacion = alfa * m * m / np.ldexp(1.0, -self.registros.astype(np.int64)).sum()
+
+        # Corrección para cardinalidades pequeñas por conteo lineal
+        vacios = int((self.registros == 0).sum())
+        if estimacion <= 2.5 * m and vacios:
+            estimacion = m * np.log(m / vacios)
+        return int(round(estimacion))
+
+
+class DistintosPorGrupo:
+    # Conjuntos de clientes por grupo, unibles para cualquier combinación de grupos
+
+    def __init__(self, conjuntos, modo, grupos=None, columna='Customer Name', precision=PRECISION_HLL, diccionario=None):
+        self.conjuntos = conjuntos
+        self.modo = modo
+        # Datos para agregar filas nuevas con los mismos grupos y los mismos códigos de cliente
+        self.grupos = grupos
+        self.columna = columna
+        self.precision = precision
+        self.diccionario = diccionario
+
+    @classmethod
+    def desde_df(cls, df, grupos, columna='Customer Name', modo=MODO_AUTO, precision=PRECISION_HLL):
+        # Construir un conjunto por combinación de las columnas de grupo
+        grupos = [grupos] if isinstance(grupos, str) else list(grupos)
+        if modo == MODO_AUTO:
+            modo = MODO_EXACTO if len(df) <= LIMITE_EXACTO else MODO_HLL
+        if modo not in (MODO_EXACTO, MODO_HLL):
+            raise ValueError(f"Modo de conteo desconocido: {modo!r}")
+
+        diccionario = pd.Index([], dtype=object) if modo == MODO_EXACTO else None
+        return cls({}, modo, grupos, columna, precision, diccionario).agregar(df)
+
+    def copia(self):
+        # Copia que comparte los conjuntos: agregar() reemplaza los que cambia por copias actualizadas
+        return DistintosPorGrupo(dict(self.conjuntos), self.modo, self.grupos, self.columna, self.precision, self.diccionario)
+
+    def agregar(self, df):
+        # Sumar las filas nuevas a los conjuntos de sus grupos, sin volver a recorrer las anteriores.
+        # Los conjuntos existentes no se modifican: los de los grupos con filas nuevas se copian
+        if not len(df):
+            return self
+
+        # Los conjuntos exactos usan códigos de diccionario; HyperLogLog usa hashes de 64 bits
+        if self.modo == MODO_EXACTO:
+            nombres = df[self.columna]
+            nuevos = pd.Index(nombres.dropna().unique()).difference(self.diccionario)
+            self.diccionario = self.diccionario.append(nuevos)
+            valores = self.diccionario.get_indexer(nombres)
+            nuevo = lambda: ConjuntoExacto(len(self.diccionario))
+        else:
+            valores = pd.util.hash_array(df[self.columna].to_numpy(dtype=object))
+            nuevo = lambda: HyperLogLog(self.precision)
+
+        # Las claves de los conjuntos son siempre tuplas con un valor por columna de grupo
+        for clave, filas in df.groupby(self.grupos, observed=True, sort=False).indices.items():
+            elegidos = valores[filas]
+            if self.modo == MODO_EXACTO:
+                elegidos = elegidos[elegidos >= 0]
+            clave = clave if isinstance(clave, tuple) else (clave,)
+            conjunto = self.conjuntos[clave].copia() if clave in self.conjuntos else nuevo()
+            self.conjuntos[clave] = conjunto.agregar(elegidos)
+        return self
+
+    def union(self, claves=None):
+        # Unir los conjuntos de las claves indicadas (todas si no se indica ninguna)
+        claves = list(self.conjuntos) if claves is None else list(claves)
+        if not claves:
+            return None
+        resultado = self.conjuntos[claves[0]].copia()
+        for clave in claves[1:]:
+            resultado.fusionar(self.conjuntos[clave])
+        return resultado
+
+    def contar(self, claves=None):
+        union = self.union(claves)
+        return union.contar() if union is not None else 0
+
+    def contar_por(self, nivel, nombre):
+        # Contar por un nivel de la clave (por ejemplo la región en claves (provincia, región))
+        valores = {}
+        for clave in self.conjuntos:
+            valores.setdefault(clave[nivel], []).append(clave)
+        return pd.DataFrame(
+            [(valor, self.contar(claves)) for valor, claves in sorted(valores.items())],
+            columns=[nombre, 'Clientes Totales'],
+        )
@@ -0,0 +1,251 @@
+# Motor de estadísticas en flujo para la tabla de Ventas y Ganancias
+#
+# Las estadísticas se acumulan bloque a bloque en una sola pasada:
+# - Suma, mínimo y máximo se combinan directamente.
+# - Promedio y varianza usan la actualización en paralelo de Chan et al.,
+#   numéricamente estable frente a la fórmula de la suma de cuadrados.
+# - La mediana es exacta en modo 'exacto' (se guardan los valores) y aproximada
+#   en modo 'aproximado' con un sketch de error relativo (ver SketchCuantiles).
+# En modo 'auto' se guardan los valores hasta LIMITE_EXACTO filas y luego se pasa al sketch.
+# Todos los acumuladores se pueden fusionar, por ejemplo uno por archivo exportado.
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# Nombres de las estadísticas en el orden en que se muestran en la tabla
+ESTADISTICAS = ['Suma Total', 'Promedio', 'Mediana', 'Desviación Estándar', 'Varianza', 'Mínimo', 'Máximo']
+
+# Modos de cálculo de la mediana
+MODO_EXACTO = 'exacto'
+MODO_APROXIMADO = 'aproximado'
+MODO_AUTO = 'auto'
+
+# Cantidad de filas hasta la que el modo 'auto' mantiene la mediana exacta
+LIMITE_EXACTO = 1_000_000
+
+# Error relativo por defecto del sketch de cuantiles
+ERROR_RELATIVO = 0.005
+
+# Filas por bloque al leer el CSV en flujo
+TAMANO_BLOQUE = 500_000
+
+
+class SketchCuantiles:
+    # Sketch de cuantiles con error relativo garantizado (esquema de DDSketch)
+    #
+    # Cada valor x != 0 cae en la cubeta i = ceil(log_gamma(|x|)) con gamma = (1 + a) / (1 - a),
+    # y la cubeta se representa por 2 * gamma^i / (gamma + 1). Para cualquier cuantil q, el valor
+    # devuelto x' cumple |x' - x| <= a * |x|, donde x es el valor de rango floor(q * (n - 1)).
+    # Los valores con |x| < minimo se cuentan como cero. La memoria crece con log(max / min)
+    # y no con la cantidad de filas, y dos sketches con el mismo 'a' se fusionan sumando cubetas.
+
+    def __init__(self, error_relativo=ERROR_RELATIVO, minimo=1e-9):
+        self.error_relativo = error_relativo
+        self.minimo = minimo
+        self.gamma = (1 + error_relativo) / (1 - error_relativo)
+        self.log_gamma = math.log(self.gamma)
+        self.positivos = {}
+        self.negativos = {}
+        self.ceros = 0
+        self.n = 0
+
+    def _sumar_cubetas(self, cubetas, magnitudes):
+        indices, conteos = np.unique(np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64), return_counts=True)
+        for indice, conteo in zip(indices.tolist(), conteos.tolist()):
+            cubetas[indice] = cubetas.get(indice, 0) + conteo
+
+    def agregar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        positivos = valores >= self.minimo
+        negativos = valores <= -self.minimo
+        self._sumar_cubetas(self.positivos, valores[positivos])
+        self._sumar_cubetas(self.negativos, -valores[negativos])
+        self.ceros += int(len(valores) - positivos.sum() - negativos.sum())
+        self.n += len(valores)
+
+    def fusionar(self, otro):
+        if otro.gamma != self.gamma:
+            raise ValueError('Sólo se pueden fusionar sketches con el mismo error relativo')
+        for propias, ajenas in ((self.positivos, otro.positivos), (self.negativos, otro.negativos)):
+            for indice, conteo in ajenas.items():
+                propias[indice] = propias.get(indice, 0) + conteo
+        self.ceros += otro.ceros
+        self.n += otro.n
+        return self
+
+    def copia(self):
+        nuevo = SketchCuantiles(self.error_relativo, self.minimo)
+        nuevo.positivos = dict(self.positivos)
+        nuevo.negativos = dict(self.negativos)
+        nuevo.ceros = self.ceros
+        nuevo.n = self.n
+        return nuevo
+
+    def _valor(self, indice):
+        return 2 * self.gamma ** indice / (self.gamma + 1)
+
+    def cuantil(self, q):
+        if not self.n:
+            return float('nan')
+        rango = math.floor(q * (self.n - 1))
+
+        # Recorrer las cubetas de menor a mayor valor: negativos de mayor magnitud, ceros y positivos
+        acumulado = 0
+        for indice in sorted(self.negativos, reverse=True):
+            acumulado += self.negativos[indice]
+            if acumulado > rango:
+                return -self._valor(indice)
+        acumulado += self.ceros
+        if acumulado > rango:
+            return 0.0
+        for indice in sorted(self.positivos):
+            acumulado += self.positivos[indice]
+            if acumulado > rango:
+                return self._valor(indice)
+        return self._valor(max(self.positivos))
+
+
+class AcumuladorEstadisticas:
+    # Estadísticas de una columna acumuladas en una sola pasada y fusionables
+
+    def __init__(self, modo=MODO_AUTO, error_relativo=ERROR_RELATIVO, limite_exacto=LIMITE_EXACTO):
+        if modo not in (MODO_EXACTO, MODO_APROXIMADO, MODO_AUTO):
+            raise ValueError(f"Modo de estadísticas desconocido: {modo!r}")
+        self.modo = modo
+        self.error_relativo = error_relativo
+        self.limite_exacto = limite_exacto
+        self.n = 0
+        self.suma = 0.0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        # Valores guardados para la mediana exacta, o None si se usa el sketch
+        self.valores = [] if modo != MODO_APROXIMADO else None
+        self.sketch = SketchCuantiles(error_relativo) if modo == MODO_APROXIMADO else None
+
+    def _combinar(self, n, suma, media, m2, minimo, maximo):
+        # Combinar momentos con la fórmula de Chan et al.
+        total = self.n + n
+        delta = media - self.media
+        self.media += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+        self.suma += suma
+        self.minimo = min(self.minimo, minimo)
+        self.maximo = max(self.maximo, maximo)
+
+    def _pasar_a_sketch(self):
+        # Reemplazar los valores guardados por el sketch al superar el límite del modo 'auto'
+        self.sketch = SketchCuantiles(self.error_relativo)
+        for bloque in self.valores:
+            self.sketch.agregar(bloque)
+        self.valores = None
+
+    def agregar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if not len(valores):
+            return self
+        media = valores.mean()
+        self._combinar(len(valores), valores.sum(), media, ((valores - media) ** 2).sum(), valores.min(), valores.max())
+        if self.valores is not None:
+            self.valores.append(valores)
+            if self.modo == MODO_AUTO and self.n > self.limite_exacto:
+                self._pasar_a_sketch()
+        else:
+            self.sketch.agregar(valores)
+        return self
+
+    def fusionar(self, otro):
+        if otro.n:
+            self._combinar(otro.n, otro.suma, otro.media, otro.m2, otro.minimo, otro.maximo)
+        if self.valores is not None and otro.valores is not None:
+            self.valores.extend(otro.valores)
+            if self.modo == MODO_AUTO and self.n > self.limite_exacto:
+                self._pasar_a_sketch()
+        else:
+            if self.sketch is None:
+                self._pasar_a_sketch()
+            if otro.sketch is not None:
+                self.sketch.fusionar(otro.sketch)
+            else:
+                for bloque in otro.valores:
+                    self.sketch.agregar(bloque)
+        return self
+
+    def copia(self):
+        # Copia independiente; los bloques de valores guardados nunca se modifican, así que se comparten
+        nuevo = AcumuladorEstadisticas(self.modo, self.error_relativo, self.limite_exacto)
+        nuevo.n, nuevo.suma, nuevo.media, nuevo.m2 = self.n, self.suma, self.media, self.m2
+        nuevo.minimo, nuevo.maximo = self.minimo, self.maximo
+        nuevo.valores = list(self.valores) if self.valores is not None else None
+        nuevo.sketch = self.sketch.copia() if self.sketch is not None else None
+        return nuevo
+
+    @property
+    def exacto(self):
+        return self.valores is not None
+
+    @property
+    def varianza(self):
+        # Varianza muestral (ddof=1), igual que pandas
+        return self.m2 / (self.n - 1) if self.n > 1 else float('nan')
+
+    @property
+    def desviacion(self):
+        return math.sqrt(self.varianza) if self.n > 1 else float('nan')
+
+    @property
+    def mediana(self):
+        if self.valores is not None:
+            return float(np.median(np.concatenate(self.valores))) if self.valores else float('nan')
+        return self.sketch.cuantil(0.5)
+
+    def resultado(self):
+        # Valores en el orden de ESTADISTICAS
+        if not self.n:
+            return [0.0] + [float('nan')] * (len(ESTADISTICAS) - 1)
+        return [self.suma, self.media, self.mediana, self.desviacion, self.varianza, self.minimo, self.maximo]
+
+
+def acumular_df(df, columnas, modo=MODO_AUTO):
+    # Acumular las estadísticas de las columnas de un DataFrame ya cargado
+    return {columna: AcumuladorEstadisticas(modo).agregar(df[columna].to_numpy()) for columna in columnas}
+
+
+def acumular_csv(ruta, columnas, modo=MODO_AUTO, tamano_bloque=TAMANO_BLOQUE):
+    # Leer el CSV por bloques, sólo con las columnas pedidas, sin cargarlo entero en memoria
+    acumuladores = {columna: AcumuladorEstadisticas(modo) for columna in columnas}
+    for bloque in pd.read_csv(ruta, encoding='utf-8', usecols=columnas, chunksize=tamano_bloque):
+        for columna in columnas:
+            acumuladores[columna].agregar(bloque[columna].to_numpy())
+    return acumuladores
+
+
+def fusionar_acumuladores(*partes):
+    # Fusionar los acumuladores de varias fuentes columna por columna
+    resultado = {}
+    for parte in partes:
+        for columna, acumulador in parte.items():
+            if columna in resultado:
+                resultado[columna].fusionar(acumulador)
+            else:
+                resultado[columna] = acumulador
+    return resultado
+
+
+def acumular_archivos(rutas, columnas, modo=MODO_AUTO, tamano_bloque=TAMANO_BLOQUE):
+    # Acumular varios archivos exportados y fusionar sus estados parciales
+    return fusionar_acumuladores(*(acumular_csv(ruta, columnas, modo, tamano_bloque) for ruta in rutas))
+
+
+def tabla_estadisticas(acumuladores):
+    # Construir la tabla de estadísticas clave con una fila por columna
+    return pd.DataFrame(
+        [[columna] + acumulador.resultado() for columna, acumulador in acumuladores.items()],
+        columns=['Categoria'] + ESTADISTICAS,
+    )
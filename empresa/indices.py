@@ -0,0 +1,92 @@
+# Índices precalculados sobre el DataFrame de pedidos
+import numpy as np
+import pandas as pd
+
+
+class IndiceFechas:
+    # Meses presentes en la columna 'Order Date', con las opciones de año y mes para los selectores.
+    # El filtro por año y mes no recorre filas: lo resuelven SeriesTemporales.ventanas, con rebanadas
+    # contiguas del calendario diario ordenado, y el cubo, con sus celdas por año y mes
+
+    def __init__(self, fechas):
+        self._fijar(np.unique(fechas.to_numpy().astype('datetime64[M]')))
+
+    def _fijar(self, periodos):
+        self.periodos = periodos
+
+        # Opciones de año y mes para los selectores
+        anios = self.periodos.astype('datetime64[Y]').astype(int) + 1970
+        self.anios = sorted(set(anios.tolist()))
+        self.meses = sorted(set((self.periodos.astype(int) % 12 + 1).tolist()))
+
+    def copia(self):
+        nuevo = IndiceFechas.__new__(IndiceFechas)
+        nuevo._fijar(self.periodos)
+        return nuevo
+
+    def agregar(self, fechas):
+        # Sumar los meses de fechas nuevas, recorriendo sólo esas fechas y los meses conocidos
+        self._fijar(np.union1d(self.periodos, fechas.to_numpy().astype('datetime64[M]')))
+        return self
+
+
+class IndiceProductos:
+    # Codificación por diccionario de 'Product Name' con las posiciones de fila de cada producto
+
+    def __init__(self, productos):
+        if not isinstance(productos.dtype, pd.CategoricalDtype):
+            productos = productos.astype('category')
+        categorias = productos.cat.categories
+        codigos = productos.cat.codes.to_numpy()
+
+        # Agrupar las posiciones de fila por código con un único ordenamiento estable
+        orden = np.argsort(codigos, kind='stable')
+        cortes = np.searchsorted(codigos[orden], np.arange(len(categorias) + 1))
+        self.posiciones = [orden[cortes[i]:cortes[i + 1]] for i in range(len(categorias))]
+        self.codigos = {nombre: codigo for codigo, nombre in enumerate(categorias) if len(self.posiciones[codigo])}
+
+        # Lista de opciones ordenada para el selector múltiple
+        self.opciones = sorted(self.codigos)
+
+    def copia(self):
+        # Copia que comparte las posiciones: agregar() reemplaza las de los productos que cambian
+        nuevo = IndiceProductos.__new__(IndiceProductos)
+        nuevo.posiciones = list(self.posiciones)
+        nuevo.codigos = dict(self.codigos)
+        nuevo.opciones = self.opciones
+        return nuevo
+
+    def agregar(self, productos, inicio):
+        # Sumar filas nuevas que ocupan las posiciones desde `inicio`; sólo se recorren esas filas y
+        # se copian las posiciones de los productos que aparecen en ellas
+        productos = pd.Series(productos, copy=False).reset_index(drop=True)
+        nuevos = False
+        for nombre, filas in productos.groupby(productos, observed=True, sort=False).indices.items():
+            filas = filas + inicio
+            if nombre in self.codigos:
+                codigo = self.codigos[nombre]
+                self.posiciones[codigo] = np.concatenate((self.posiciones[codigo], filas))
+            else:
+                self.codigos[nombre] = len(self.posiciones)
+                self.posiciones.append(filas)
+                nuevos = True
+        if nuevos:
+            self.opciones = sorted(self.codigos)
+        return self
+
+    def posiciones_de(self, nombres):
+        # Reunir las posiciones de fila de los productos indicados, en orden ascendente
+        partes = [self.posiciones[self.codigos[nombre]] for nombre in nombres if nombre in self.codigos]
+        if not partes:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(partes))
+
+    def contar(self, nombres):
+        # Cantidad de filas de los productos indicados, sin reunir sus posiciones
+        return sum(len(self.posiciones[self.codigos[nombre]]) for nombre in nombres if nombre in self.codigos)
+
+    def filas(self, df, nombres):
+        # Obtener las filas de los productos seleccionados; sin selección se devuelven todas
+        if not nombres:
+            return df
+        return df.take(self.posiciones_de(nombres))
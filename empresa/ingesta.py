@@ -0,0 +1,254 @@
+# Ingesta incremental de lotes de pedidos
+#
+# VersionDatos reúne el conjunto de datos compartido y todas las estructuras derivadas de una
+# versión de los datos, y no cambia después de publicarse. Cada lote nuevo se valida contra el
+# esquema, se descartan las filas ya conocidas por su par (Row ID, Order ID) y con las filas
+# restantes se arma la versión siguiente: las filas se anexan sin copiar las anteriores y se
+# suman como delta al cubo, a las series temporales, a las estadísticas, a los conjuntos de
+# clientes y a los índices de fechas y productos. Cada estructura se copia sólo en lo que cambia
+# (las celdas, posiciones y conjuntos que tocan las filas nuevas) y comparte el resto con la
+# versión anterior.
+#
+# EstadoDatos publica la versión nueva reemplazando una sola referencia, que lleva también el
+# número de versión: quien toma `EstadoDatos.actual` ve siempre una versión completa y coherente,
+# aunque mientras tanto se publique otra.
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from empresa.carga import COLUMNA_SIN_NOMBRE, COLUMNAS_FECHA, ESQUEMA, cargar_datos, normalizar
+from empresa.compartido import DatosCompartidos
+from empresa.cubo import CuboVentas
+from empresa.distintos import DistintosPorGrupo
+from empresa.estadisticas import acumular_df, tabla_estadisticas
+from empresa.indices import IndiceFechas, IndiceProductos
+from empresa.paralelo import AgregadorParalelo, AlmacenColumnas
+from empresa.series import SeriesTemporales
+
+
+# Columnas que identifican un pedido; una fila con un par ya cargado es un duplicado
+CLAVES = ['Row ID', 'Order ID']
+
+# Tipo de las claves de pedido: el par completo, ordenado por fila y después por pedido
+TIPO_CLAVE = np.dtype([('fila', np.int64), ('pedido', np.int64)])
+
+# Columnas que pueden venir vacías (en Empresa.CSV falta parte de 'Product Base Margin')
+COLUMNAS_OPCIONALES = ['Product Base Margin']
+
+# Subdirectorios del directorio de entrada para los lotes ya procesados y los rechazados
+PROCESADOS = 'procesados'
+RECHAZADOS = 'rechazados'
+
+
+class LoteInvalido(ValueError):
+    # El lote no cumple el esquema de Empresa.CSV
+    pass
+
+
+def validar_lote(crudo):
+    # Normalizar un lote crudo con el esquema del CSV y rechazarlo si no lo cumple
+    columnas = crudo.rename(columns={COLUMNA_SIN_NOMBRE: 'Product Container'}).columns
+    faltantes = [columna for columna in list(ESQUEMA) + COLUMNAS_FECHA if columna not in columnas]
+    if faltantes:
+        raise LoteInvalido(f'Faltan columnas: {faltantes}')
+    try:
+        lote = normalizar(crudo)
+    except (ValueError, TypeError) as error:
+        raise LoteInvalido(f'Valores que no cumplen el esquema: {error}') from error
+    vacias = [columna for columna in lote.columns if columna not in COLUMNAS_OPCIONALES and lote[columna].isna().any()]
+    if vacias:
+        raise LoteInvalido(f'Columnas con valores vacíos: {vacias}')
+    return lote
+
+
+def leer_lote(ruta):
+    return pd.read_csv(ruta, encoding='utf-8')
+
+
+def lotes_procesados(directorio):
+    # Rutas de los lotes ya procesados del directorio de entrada, en el orden en que se agregaron
+    carpeta = os.path.join(directorio, PROCESADOS) if directorio else None
+    if not carpeta or not os.path.isdir(carpeta):
+        return []
+    return [os.path.join(carpeta, nombre) for nombre in sorted(os.listdir(carpeta))]
+
+
+def _claves(df):
+    # Pares (Row ID, Order ID) como arreglo estructurado: se comparan campo por campo, sin mezclar
+    # los dos valores en un solo entero
+    fila, pedido = CLAVES
+    claves = np.empty(len(df), dtype=TIPO_CLAVE)
+    claves['fila'] = df[fila].to_numpy(dtype=np.int64)
+    claves['pedido'] = df[pedido].to_numpy(dtype=np.int64)
+    return claves
+
+
+def _orden(claves):
+    # Orden estable de las claves por fila y después por pedido, el mismo con que las compara numpy
+    return np.lexsort((claves['pedido'], claves['fila']))
+
+
+def _unicas(claves):
+    # Claves sin repetir, ordenadas para buscarlas por bisección
+    ordenadas = claves[_orden(claves)]
+    return ordenadas[np.concatenate(([True], ordenadas[1:] != ordenadas[:-1]))] if len(ordenadas) else ordenadas
+
+
+def _repetidas(claves):
+    # Marcar las claves que ya aparecieron antes dentro del mismo arreglo
+    orden = _orden(claves)
+    ordenadas = claves[orden]
+    repetidas = np.zeros(len(claves), dtype=bool)
+    repetidas[orden[1:]] = ordenadas[1:] == ordenadas[:-1]
+    return repetidas
+
+
+class VersionDatos:
+    # Conjunto de datos compartido y estructuras derivadas de una versión; no se modifica
+
+    def __init__(self, version, datos, cubo, series, clientes, indice_fechas, indice_productos, acumuladores):
+        for nombre, valor in (('version', version), ('datos', datos), ('cubo', cubo), ('series', series),
+                              ('clientes', clientes), ('indice_fechas', indice_fechas),
+                              ('indice_productos', indice_productos), ('_acumuladores', acumuladores),
+                              ('_candado', threading.Lock()), ('_estadisticas', None), ('_agregador', None)):
+            object.__setattr__(self, nombre, valor)
+
+    @classmethod
+    def desde_df(cls, df):
+        # Construir la primera versión; el DataFrame no debe seguir usándose
+        return cls(
+            0,
+            DatosCompartidos.desde_df(df),
+            CuboVentas.desde_df(df),
+            SeriesTemporales.desde_df(df),
+            DistintosPorGrupo.desde_df(df, ['Province', 'Region']),
+            IndiceFechas(df['Order Date']),
+            IndiceProductos(df['Product Name']),
+            acumular_df(df, ['Sales', 'Profit']),
+        )
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError('Una versión publicada es de sólo lectura')
+
+    def __len__(self):
+        return len(self.datos)
+
+    def agregar(self, lote):
+        # Versión siguiente con las filas nuevas de un lote ya validado y sin duplicados
+        siguiente = VersionDatos(
+            self.version + 1,
+            self.datos.anexar(lote),
+            self.cubo.copia().agregar(lote),
+            self.series.copia().agregar(lote),
+            self.clientes.copia().agregar(lote),
+            self.indice_fechas.copia().agregar(lote['Order Date']),
+            self.indice_productos.copia().agregar(lote['Product Name'], len(self.datos)),
+            {columna: acumulador.copia().agregar(lote[columna].to_numpy()) for columna, acumulador in self._acumuladores.items()},
+        )
+        # Si esta versión ya exportó sus columnas, la siguiente sólo escribe las filas del lote
+        with self._candado:
+            anterior = self._agregador
+        if anterior is not None:
+            siguiente._fijar_agregador(anterior.anexar(lote))
+        return siguiente
+
+    @property
+    def estadisticas(self):
+        # La tabla se arma al pedirla por primera vez en cada versión (la mediana exacta recorre los valores)
+        with self._candado:
+            if self._estadisticas is None:
+                object.__setattr__(self, '_estadisticas', tabla_estadisticas(self._acumuladores))
+            return self._estadisticas
+
+    def agregador(self):
+        # El almacén mapeado en memoria se exporta al pedirlo por primera vez, salvo que venga de
+        # la versión anterior; las columnas se sueltan cuando ya nadie usa la versión
+        with self._candado:
+            if self._agregador is None:
+                self._fijar_agregador(AgregadorParalelo(AlmacenColumnas.exportar(self.datos.vista())))
+            return self._agregador
+
+    def _fijar_agregador(self, agregador):
+        weakref.finalize(self, agregador.cerrar)
+        object.__setattr__(self, '_agregador', agregador)
+
+
+class EstadoDatos:
+    # Versión publicada de los datos y claves de los pedidos cargados
+
+    def __init__(self, df):
+        self._candado = threading.Lock()
+        self._revisando = threading.Lock()
+        self._claves = _unicas(_claves(df))
+        self.actual = VersionDatos.desde_df(df)
+
+    @classmethod
+    def desde_csv(cls, ruta, directorio=None):
+        # Cargar el CSV y volver a aplicar los lotes ya procesados del directorio de entrada
+        estado = cls(cargar_datos(ruta))
+        for lote in lotes_procesados(directorio):
+            estado.agregar_lote(leer_lote(lote))
+        return estado
+
+    @property
+    def version(self):
+        return self.actual.version
+
+    def agregar_lote(self, crudo):
+        # Validar, descartar duplicados y publicar una versión con las filas nuevas
+        lote = validar_lote(crudo)
+        claves = _claves(lote)
+        with self._candado:
+            posiciones = np.searchsorted(self._claves, claves).clip(max=max(len(self._claves) - 1, 0))
+            conocidas = self._claves[posiciones] == claves if len(self._claves) else np.zeros(len(claves), dtype=bool)
+            nuevas = ~_repetidas(claves) & ~conocidas
+            resumen = {'filas': len(lote), 'nuevas': int(nuevas.sum()), 'duplicadas': int(len(lote) - nuevas.sum())}
+            if not resumen['nuevas']:
+                return resumen
+
+            # Todo se arma aparte y se publica al final con una sola asignación
+            actual = self.actual
+            siguiente = actual.agregar(lote[nuevas].reset_index(drop=True)[list(actual.datos.nombres)])
+            agregadas = claves[nuevas]
+            agregadas = agregadas[_orden(agregadas)]
+            self._claves = np.insert(self._claves, np.searchsorted(self._claves, agregadas), agregadas)
+            self.actual = siguiente
+        return resumen
+
+    def revisar_directorio(self, directorio):
+        # Ingerir los CSV del directorio de entrada y moverlos a 'procesados' o 'rechazados'.
+        # Quien deja un archivo debe escribirlo con otra extensión y renombrarlo al terminar.
+        # Si otra sesión ya está revisando el directorio, no se espera a que termine.
+        if not os.path.isdir(directorio) or not self._revisando.acquire(blocking=False):
+            return []
+        try:
+            return procesar_directorio(directorio, self.agregar_lote)
+        finally:
+            self._revisando.release()
+
+
+def procesar_directorio(directorio, agregar_lote):
+    # Pasar cada CSV del directorio a agregar_lote y moverlo a 'procesados' o a 'rechazados'
+    resumenes = []
+    for nombre in sorted(os.listdir(directorio)):
+        ruta = os.path.join(directorio, nombre)
+        if not os.path.isfile(ruta) or not nombre.lower().endswith('.csv'):
+            continue
+        destino = f"{time.strftime('%Y%m%d-%H%M%S')}_{nombre}"
+        try:
+            resumen = agregar_lote(leer_lote(ruta))
+        except (ValueError, OSError) as error:
+            os.makedirs(os.path.join(directorio, RECHAZADOS), exist_ok=True)
+            os.replace(ruta, os.path.join(directorio, RECHAZADOS, destino))
+            with open(os.path.join(directorio, RECHAZADOS, destino + '.error'), 'w', encoding='utf-8') as archivo:
+                archivo.write(f'{error}\n')
+            resumenes.append({'archivo': nombre, 'error': str(error)})
+            continue
+        os.makedirs(os.path.join(directorio, PROCESADOS), exist_ok=True)
+        os.replace(ruta, os.path.join(directorio, PROCESADOS, destino))
+        resumenes.append({'archivo': nombre, **resumen})
+    return resumenes
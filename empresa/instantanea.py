@@ -0,0 +1,256 @@
+# Instantánea precalculada de las salidas del tablero con los filtros por defecto
+#
+# `python -m empresa.instantanea` carga Empresa.CSV, construye el estado completo y guarda en un
+# solo archivo Parquet el resultado de cada consulta de DEFECTO: cada fila del archivo es una
+# parte de un resultado, con los DataFrames serializados en formato Arrow IPC y los valores
+# simples en JSON. Los metadatos guardan la versión del formato y la huella del CSV de origen,
+# de modo que una instantánea de otro CSV se ignora. Las partes se decodifican al pedirlas.
+#
+# FuenteDatos responde con la instantánea mientras no se hayan agregado lotes y prepara en
+# segundo plano el motor de consultas (ver empresa/motores.py) para los demás filtros.
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from empresa.carga import origen_archivo, verificar_origen
+from empresa.dispersion import MODO_REJILLA
+from empresa.ingesta import lotes_procesados
+from empresa.metricas import Registro
+from empresa.motores import MOTOR_PANDAS, crear_motor
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Sin pyarrow no hay instantánea y todo se calcula en vivo
+    pa = None
+    pq = None
+
+
+# Versión del formato de la instantánea; cambiarla invalida los archivos existentes
+VERSION_INSTANTANEA = 2
+
+# Clave de los metadatos de la instantánea dentro del archivo Parquet
+CLAVE_METADATOS = b'empresa.instantanea'
+
+
+# Consultas con los valores iniciales de los widgets de Analisis.py, que forman la primera pantalla
+DEFECTO = [
+    ('filas', ()),
+    ('opciones_productos', ()),
+    ('opciones_fechas', ()),
+    ('estadisticas', ()),
+    ('filas_productos', ((),)),
+    ('dispersion', ((), MODO_REJILLA)),
+    ('top_productos', ((),)),
+    ('total_fechas', (None, None)),
+    ('top_fechas', (None, None)),
+    ('clientes_por_region', ()),
+    ('totales_region_provincia', (0, 100000)),
+    ('totales_envios', (None, None)),
+]
+
+# Marca de una consulta que no está en la instantánea
+FALTA = object()
+
+
+def clave_consulta(nombre, argumentos):
+    # Las tuplas y las listas de argumentos dan la misma clave
+    return f'{nombre}:{json.dumps(list(argumentos), default=str)}'
+
+
+def ruta_instantanea(ruta_csv):
+    # La instantánea vive junto al CSV
+    return os.path.splitext(ruta_csv)[0] + '.instantanea.parquet'
+
+
+def _metadatos_origen(ruta_csv):
+    return {'version': VERSION_INSTANTANEA, **origen_archivo(ruta_csv)}
+
+
+def _guardar(tabla, metadatos, ruta):
+    # Escribir la tabla con sus metadatos; se escribe aparte y se reemplaza de una vez
+    temporal = ruta + '.tmp'
+    pq.write_table(tabla.replace_schema_metadata({CLAVE_METADATOS: json.dumps(metadatos).encode('utf-8')}), temporal)
+    os.replace(temporal, ruta)
+
+
+def _serializar(valor):
+    # Convertir un DataFrame en bytes Arrow IPC; los demás valores van en JSON
+    if isinstance(valor, pd.DataFrame):
+        tabla = pa.Table.from_pandas(valor)
+        salida = pa.BufferOutputStream()
+        with pa.ipc.new_stream(salida, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+        return salida.getvalue().to_pybytes(), None
+    return None, json.dumps(valor, default=lambda numero: numero.item())
+
+
+def _deserializar(datos, valor):
+    if datos is not None:
+        return pa.ipc.open_stream(datos).read_pandas()
+    return json.loads(valor)
+
+
+def escribir_instantanea(ruta_csv, ruta=None):
+    # Calcular las consultas de DEFECTO sobre el CSV y guardarlas en un solo archivo
+    if pa is None:
+        raise RuntimeError('Se necesita pyarrow para escribir la instantánea')
+    ruta = ruta or ruta_instantanea(ruta_csv)
+    motor = crear_motor(ruta_csv, motor=MOTOR_PANDAS)
+    filas = {'clave': [], 'parte': [], 'datos': [], 'valor': []}
+    tuplas = []
+    for nombre, argumentos in DEFECTO:
+        clave = clave_consulta(nombre, argumentos)
+        resultado = motor.consultar(nombre, *argumentos)
+        if isinstance(resultado, tuple):
+            tuplas.append(clave)
+        for parte, valor in enumerate(resultado if isinstance(resultado, tuple) else (resultado,)):
+            datos, texto = _serializar(valor)
+            filas['clave'].append(clave)
+            filas['parte'].append(parte)
+            filas['datos'].append(datos)
+            filas['valor'].append(texto)
+
+    tabla = pa.table(filas, schema=pa.schema([
+        ('clave', pa.string()), ('parte', pa.int16()), ('datos', pa.binary()), ('valor', pa.string()),
+    ]))
+    metadatos = {**_metadatos_origen(ruta_csv), 'tuplas': tuplas, 'creada': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    _guardar(tabla, metadatos, ruta)
+    return ruta
+
+
+class Instantanea:
+    # Resultados precalculados leídos de un archivo de instantánea
+
+    def __init__(self, partes, tuplas):
+        self.partes = partes
+        self.tuplas = set(tuplas)
+        self._resultados = {}
+
+    @classmethod
+    def leer(cls, ruta_csv, ruta=None):
+        # Devolver la instantánea si existe y corresponde al CSV, si no None
+        ruta = ruta or ruta_instantanea(ruta_csv)
+        if pq is None or not os.path.exists(ruta):
+            return None
+        try:
+            tabla = pq.read_table(ruta)
+            metadatos = json.loads((tabla.schema.metadata or {}).get(CLAVE_METADATOS, b'{}'))
+        except (OSError, ValueError, pa.ArrowException):
+            return None
+        if metadatos.get('version') != VERSION_INSTANTANEA:
+            return None
+        vigentes = verificar_origen(metadatos, ruta_csv)
+        if vigentes is None:
+            return None
+        if vigentes != metadatos:
+            # El CSV sólo cambió de fecha: guardar la firma nueva para no volver a calcular el hash
+            try:
+                _guardar(tabla, vigentes, ruta)
+            except (OSError, pa.ArrowException):
+                pass
+        partes = {}
+        for clave, parte, datos, valor in zip(*(tabla.column(nombre).to_pylist() for nombre in ('clave', 'parte', 'datos', 'valor'))):
+            partes.setdefault(clave, []).append((parte, datos, valor))
+        return cls(partes, metadatos.get('tuplas', []))
+
+    def obtener(self, nombre, argumentos):
+        # Decodificar el resultado de una consulta la primera vez que se pide
+        clave = clave_consulta(nombre, argumentos)
+        if clave not in self.partes:
+            return FALTA
+        if clave not in self._resultados:
+            valores = [_deserializar(datos, valor) for _, datos, valor in sorted(self.partes[clave], key=lambda parte: parte[0])]
+            self._resultados[clave] = tuple(valores) if clave in self.tuplas else valores[0]
+        return self._resultados[clave]
+
+
+class FuenteDatos:
+    # Instantánea para la primera pantalla y motor de consultas para el resto de los filtros
+
+    def __init__(self, ruta_csv, directorio=None, motor=None, registro=None):
+        self.ruta_csv = ruta_csv
+        self.directorio = directorio
+        self.nombre_motor = motor
+        # Registro donde se mide la construcción del motor, también la que corre en segundo plano
+        self.registro = registro if registro is not None else Registro()
+        self._motor = None
+        self._cerrada = False
+        self._candado = threading.Lock()
+
+        # Con lotes ya procesados la instantánea del CSV no refleja los datos actuales
+        self.instantanea = None if lotes_procesados(directorio) else Instantanea.leer(ruta_csv)
+
+        # El motor se prepara en segundo plano mientras se responde con la instantánea
+        if self.instantanea is not None:
+            threading.Thread(target=self._preparar_motor, daemon=True).start()
+
+    def _construir_motor(self):
+        with self.registro.medir('datos', 'motor') as medicion:
+            motor = crear_motor(self.ruta_csv, self.directorio, self.nombre_motor)
+            medicion.filas_salida = lambda: motor.consultar('filas')
+        return motor
+
+    def _preparar_motor(self):
+        # Si la fuente se cierra antes de empezar no se construye nada, y si se cierra durante la
+        # construcción el motor se descarta al terminar
+        with self._candado:
+            if self._cerrada or self._motor is not None:
+                return
+            motor = self._construir_motor()
+            if not self._cerrada:
+                self._motor = motor
+
+    def motor(self):
+        with self._candado:
+            motor = self._motor
+            if motor is None:
+                motor = self._motor = self._construir_motor()
+            return motor
+
+    def cerrar(self):
+        # La fuente salió de la caché: soltar el motor y no prepararlo en segundo plano, para que sus
+        # datos no sigan en memoria junto a los de la fuente nueva. Las consultas que aún la usen
+        # construyen otro motor, que se libera con la fuente
+        self._cerrada = True
+        self._motor = None
+
+    @property
+    def version(self):
+        # Cantidad de lotes agregados; mientras el motor no existe los datos son los del CSV
+        return self._motor.version if self._motor is not None else 0
+
+    def consultar(self, nombre, *argumentos):
+        # Responder desde la instantánea si los datos no cambiaron desde el CSV; si no, consultar al motor
+        if self.instantanea is not None and self.version == 0:
+            resultado = self.instantanea.obtener(nombre, argumentos)
+            if resultado is not FALTA:
+                return resultado
+        return self.motor().consultar(nombre, *argumentos)
+
+    def revisar_directorio(self, directorio):
+        # Sólo hace falta el motor si hay algún lote pendiente
+        if not os.path.isdir(directorio) or not any(nombre.lower().endswith('.csv') for nombre in os.listdir(directorio)):
+            return []
+        return self.motor().revisar_directorio(directorio)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Precalcular las salidas del tablero con los filtros por defecto.')
+    parser.add_argument('csv', nargs='?', default='Empresa.CSV')
+    parser.add_argument('--salida', help='archivo de la instantánea (por defecto junto al CSV)')
+    opciones = parser.parse_args(argumentos)
+    inicio = time.perf_counter()
+    ruta = escribir_instantanea(opciones.csv, opciones.salida)
+    print(f'Instantánea escrita en {ruta} ({os.path.getsize(ruta) / 1024:,.0f} KiB, {len(DEFECTO)} consultas, '
+          f'{time.perf_counter() - inicio:.2f} s)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+# Instrumentación por sección: tiempos, filas y tamaño de los gráficos enviados
+#
+# Con el registro desactivado, medir() devuelve siempre el mismo objeto sin hacer nada,
+# de modo que la instrumentación puede quedar en el código sin costo apreciable. Las filas
+# de entrada y de salida se pueden pasar como funciones, que sólo se llaman si se mide.
+import json
+import logging
+import os
+import time
+from collections import deque
+
+
+# Variable de entorno que activa la instrumentación para todas las sesiones, o que con el valor
+# DEBUG_POR_URL permite que cada sesión la active con ?debug=1
+VARIABLE_DEBUG = 'EMPRESA_DEBUG'
+DEBUG_POR_URL = 'url'
+VALORES_ACTIVOS = ('1', 'true', 'si', 'sí')
+
+# Cantidad máxima de mediciones que se guardan por registro
+MAXIMO_EVENTOS = 2000
+
+registro_log = logging.getLogger('empresa.metricas')
+
+
+def debug_activo(parametros=None):
+    # Activar con EMPRESA_DEBUG=1, o con ?debug=1 en la URL sólo si EMPRESA_DEBUG=url: sin la
+    # variable el parámetro se ignora y ningún visitante puede ver ni exportar las mediciones
+    entorno = os.environ.get(VARIABLE_DEBUG, '').lower()
+    if entorno == DEBUG_POR_URL:
+        return str((parametros or {}).get('debug', '')).lower() in VALORES_ACTIVOS
+    return entorno in VALORES_ACTIVOS
+
+
+class _SinMedicion:
+    # Medición vacía compartida que se usa cuando el registro está desactivado
+    filas_salida = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def __setattr__(self, nombre, valor):
+        pass
+
+
+SIN_MEDICION = _SinMedicion()
+
+
+class Medicion:
+    # Medición de una fase de una sección; se usa como administrador de contexto
+
+    def __init__(self, registro, seccion, fase, filas_entrada, grafico):
+        self.registro = registro
+        self.seccion = seccion
+        self.fase = fase
+        self.filas_entrada = filas_entrada
+        self.grafico = grafico
+        self.filas_salida = None
+        self.inicio = None
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        segundos = time.perf_counter() - self.inicio
+        evento = {
+            'seccion': self.seccion,
+            'fase': self.fase,
+            'segundos': segundos,
+            'filas_entrada': self.filas_entrada() if callable(self.filas_entrada) else self.filas_entrada,
+            'filas_salida': self.filas_salida() if callable(self.filas_salida) else self.filas_salida,
+        }
+        if self.grafico is not None:
+            evento['grafico'] = self.grafico
+        self.registro.agregar(evento)
+        return False
+
+
+class Registro:
+    # Mediciones de una sesión del tablero
+
+    def __init__(self, activo=False, maximo=MAXIMO_EVENTOS):
+        self.activo = activo
+        self.eventos = deque(maxlen=maximo)
+        # Totales de toda la sesión por etiquetas; no se pierden al descartar los eventos más viejos
+        self.segundos = {}
+        self.conteos = {}
+        self.filas = {}
+        self.cargas = {}
+
+    def medir(self, seccion, fase, filas_entrada=None, grafico=None):
+        if not self.activo:
+            return SIN_MEDICION
+        return Medicion(self, seccion, fase, filas_entrada, grafico)
+
+    def grafico(self, seccion, nombre, grafico):
+        # Registrar los bytes de la especificación Vega-Lite (con sus datos) que se envía al navegador
+        if not self.activo:
+            return
+        import altair as alt
+
+        # Serializar con los datos en línea y sin el límite de filas de Altair, como lo recibe Vega-Lite
+        inicio = time.perf_counter()
+        with alt.data_transformers.enable('default', max_rows=None):
+            carga = len(grafico.to_json(indent=None).encode('utf-8'))
+        self.agregar({
+            'seccion': seccion,
+            'fase': 'serializacion',
+            'grafico': nombre,
+            'segundos': time.perf_counter() - inicio,
+            'bytes': carga,
+        })
+
+    def agregar(self, evento):
+        evento['marca'] = time.time()
+        self.eventos.append(evento)
+        etiquetas = f'seccion="{evento["seccion"]}",fase="{evento["fase"]}"'
+        if evento.get('grafico'):
+            etiquetas += f',grafico="{evento["grafico"]}"'
+        self.segundos[etiquetas] = self.segundos.get(etiquetas, 0.0) + evento['segundos']
+        self.conteos[etiquetas] = self.conteos.get(etiquetas, 0) + 1
+        if evento.get('filas_entrada') is not None:
+            self.filas[etiquetas + ',sentido="entrada"'] = evento['filas_entrada']
+        if evento.get('filas_salida') is not None:
+            self.filas[etiquetas + ',sentido="salida"'] = evento['filas_salida']
+        if evento.get('bytes') is not None:
+            self.cargas[etiquetas] = evento['bytes']
+        registro_log.debug(json.dumps(evento, ensure_ascii=False))
+
+    def resumen(self):
+        # Última medición de cada (sección, fase, gráfico), en el orden en que ocurrieron
+        ultimos = {}
+        for evento in self.eventos:
+            ultimos[(evento['seccion'], evento['fase'], evento.get('grafico'))] = evento
+        return list(ultimos.values())
+
+    def a_json_lineas(self):
+        # Exportar todas las mediciones como registros estructurados, una línea JSON por evento
+        return '\n'.join(json.dumps(evento, ensure_ascii=False) for evento in self.eventos)
+
+    def a_prometheus(self, prefijo='empresa'):
+        # Exportar los totales de la sesión en el formato de texto de Prometheus; la suma y la
+        # cantidad sólo crecen aunque los eventos viejos ya no estén en memoria
+        segundos, conteos, filas, cargas = self.segundos, self.conteos, self.filas, self.cargas
+        lineas = [
+            f'# HELP {prefijo}_seccion_segundos Tiempo de cada fase de cada sección.',
+            f'# TYPE {prefijo}_seccion_segundos summary',
+        ]
+        for etiquetas in segundos:
+            lineas.append(f'{prefijo}_seccion_segundos_sum{{{etiquetas}}} {segundos[etiquetas]:.6f}')
+            lineas.append(f'{prefijo}_seccion_segundos_count{{{etiquetas}}} {conteos[etiquetas]}')
+        lineas += [
+            f'# HELP {prefijo}_seccion_filas Filas de entrada y de salida de la última medición.',
+            f'# TYPE {prefijo}_seccion_filas gauge',
+        ]
+        lineas += [f'{prefijo}_seccion_filas{{{etiquetas}}} {valor}' for etiquetas, valor in filas.items()]
+        lineas += [
+            f'# HELP {prefijo}_grafico_bytes Bytes de la última especificación enviada de cada gráfico.',
+            f'# TYPE {prefijo}_grafico_bytes gauge',
+        ]
+        lineas += [f'{prefijo}_grafico_bytes{{{etiquetas}}} {valor}' for etiquetas, valor in cargas.items()]
+        return '\n'.join(lineas) + '\n'
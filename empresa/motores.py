@@ -0,0 +1,499 @@
+# Motores de consulta del tablero
+#
+# Las secciones piden cada resultado por nombre de consulta (ver CONSULTAS) con los valores de
+# sus widgets, sin saber dónde están los datos. Hay dos motores con las mismas consultas:
+# - MotorPandas responde con las estructuras en memoria de EstadoDatos (cubo, series, índices).
+# - MotorSQLite guarda los pedidos en una base SQLite local junto al CSV, cargada por bloques
+#   sin tener nunca el conjunto completo en un DataFrame. Los filtros de productos, fechas y
+#   rango de ventas se traducen a predicados WHERE sobre índices de 'Order Date',
+#   'Product Name', Region/Province y 'Sales', y a Python sólo vuelven resultados agregados
+#   (o las filas de la dispersión cuando son pocas).
+# El motor se elige con la variable de entorno EMPRESA_MOTOR ('pandas' por defecto o 'sqlite').
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from empresa.carga import COLUMNAS_FECHA, ESQUEMA, normalizar, origen_archivo, verificar_origen
+from empresa.dispersion import CELDAS_REJILLA, COLUMNAS_DISPERSION, MODO_MUESTRA, MODO_REJILLA, UMBRAL_FILAS, preparar_dispersion
+from empresa.estadisticas import ESTADISTICAS
+from empresa.ingesta import EstadoDatos, leer_lote, lotes_procesados, procesar_directorio, validar_lote
+from empresa.secciones import clientes_por_region, top_fechas, top_productos, totales_envios, totales_region_provincia
+from empresa.series import MEDIDAS, SeriesTemporales
+
+
+# Variable de entorno con el motor de consultas y motores disponibles
+VARIABLE_MOTOR = 'EMPRESA_MOTOR'
+MOTOR_PANDAS = 'pandas'
+MOTOR_SQLITE = 'sqlite'
+
+# Versión del formato de la base SQLite; cambiarla obliga a reconstruir las existentes
+VERSION_BASE = 2
+
+# Filas del CSV que se leen e insertan por bloque al construir la base
+TAMANO_BLOQUE = 100_000
+
+# Columnas de la tabla de pedidos, en el orden del esquema
+COLUMNAS = list(ESQUEMA) + COLUMNAS_FECHA
+
+# Índice único del par que identifica un pedido, usado para descartar duplicados al insertar
+INDICE_CLAVE = ('pedidos_clave', ['Row ID', 'Order ID'])
+
+# Índices de los filtros del tablero. Cada uno incluye las columnas que suman sus consultas, de
+# modo que SQLite las resuelve leyendo sólo el índice
+INDICES = {
+    'pedidos_fecha': ['Order Date', 'Sales', 'Profit'],
+    'pedidos_producto': ['Product Name', 'Sales', 'Profit'],
+    'pedidos_region': ['Region', 'Province', 'Customer Name'],
+    'pedidos_ventas': ['Sales', 'Profit', 'Region', 'Province'],
+}
+
+# Cantidad de productos que muestran los rankings y de fechas del top de fechas
+TOP_PRODUCTOS = 10
+TOP_FECHAS = 50
+
+# Resultados de la versión actual que MotorSQLite guarda para no recorrer la tabla en cada reejecución
+MAXIMO_RESULTADOS = 256
+
+
+def _totales_region_provincia(estado, minimo, maximo):
+    agregador = None if estado.cubo.cubre_rango('Sales', minimo, maximo) else estado.agregador()
+    return totales_region_provincia(estado.cubo, estado.datos.vista(['Region', 'Province', 'Sales', 'Profit']), minimo, maximo, agregador)
+
+
+def _dispersion(estado, productos, modo):
+    # Los lotes se anexan al final, así que las filas se ordenan por fecha (estable, como en
+    # SQLite por 'Order Date' y rowid) sólo si algún lote trajo fechas anteriores a las cargadas
+    filas = estado.indice_productos.filas(estado.datos.vista(COLUMNAS_DISPERSION), list(productos))
+    if not filas['Order Date'].is_monotonic_increasing:
+        filas = filas.sort_values('Order Date', kind='stable')
+    return preparar_dispersion(filas, modo=modo)
+
+
+# Consultas del tablero sobre una VersionDatos; los argumentos son los valores de los widgets
+CONSULTAS = {
+    'filas': lambda estado: len(estado.datos),
+    'opciones_productos': lambda estado: estado.indice_productos.opciones,
+    'opciones_fechas': lambda estado: (estado.indice_fechas.anios, estado.indice_fechas.meses),
+    'estadisticas': lambda estado: estado.estadisticas,
+    'filas_productos': lambda estado, productos: estado.indice_productos.contar(list(productos)) if productos else len(estado.datos),
+    'dispersion': _dispersion,
+    'top_productos': lambda estado, productos: top_productos(estado.cubo, list(productos)),
+    'total_fechas': lambda estado, anio, mes: (estado.series.total('Sales', anio, mes), estado.series.total('Profit', anio, mes)),
+    'top_fechas': lambda estado, anio, mes: top_fechas(estado.series, anio, mes),
+    'serie': lambda estado, frecuencia, indicador, anio, mes: estado.series.serie(frecuencia, indicador, anio, mes),
+    'clientes_por_region': lambda estado: clientes_por_region(estado.clientes),
+    'totales_region_provincia': _totales_region_provincia,
+    'totales_envios': lambda estado, anio, mes: totales_envios(estado.cubo, anio, mes),
+}
+
+
+def motor_configurado():
+    # Motor elegido en el entorno; por defecto el de pandas
+    return os.environ.get(VARIABLE_MOTOR, MOTOR_PANDAS).lower()
+
+
+def crear_motor(ruta_csv, directorio=None, motor=None):
+    motor = motor or motor_configurado()
+    if motor == MOTOR_PANDAS:
+        return MotorPandas.desde_csv(ruta_csv, directorio)
+    if motor == MOTOR_SQLITE:
+        return MotorSQLite.desde_csv(ruta_csv, directorio)
+    raise ValueError(f'Motor de consultas desconocido: {motor!r}')
+
+
+class MotorPandas:
+    # Consultas sobre las estructuras en memoria de un EstadoDatos
+
+    def __init__(self, estado):
+        self.estado = estado
+
+    @classmethod
+    def desde_csv(cls, ruta_csv, directorio=None):
+        return cls(EstadoDatos.desde_csv(ruta_csv, directorio))
+
+    @property
+    def version(self):
+        return self.estado.version
+
+    def consultar(self, nombre, *argumentos):
+        # Cada consulta lee una sola versión publicada, aunque mientras tanto se agregue un lote
+        return CONSULTAS[nombre](self.estado.actual, *argumentos)
+
+    def revisar_directorio(self, directorio):
+        return self.estado.revisar_directorio(directorio)
+
+
+def ruta_base(ruta_csv):
+    # La base SQLite vive junto al CSV
+    return os.path.splitext(ruta_csv)[0] + '.sqlite'
+
+
+def _columnas(nombres):
+    # Nombres de columna entre comillas dobles, separados por comas
+    return ', '.join(f'"{nombre}"' for nombre in nombres)
+
+
+def _tipo_sql(columna):
+    tipo = ESQUEMA.get(columna, '')
+    if tipo.startswith('int'):
+        return 'INTEGER'
+    if tipo.startswith('float'):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _filas_sql(df):
+    # Filas del DataFrame normalizado como tuplas de valores de Python; las fechas van en ISO
+    listas = []
+    for columna in COLUMNAS:
+        serie = df[columna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            serie = serie.dt.strftime('%Y-%m-%d')
+        listas.append(serie.astype(object).where(serie.notna(), None).tolist())
+    return zip(*listas)
+
+
+def _insertar(conexion, df):
+    # Insertar las filas ignorando los pares (Row ID, Order ID) ya cargados; devuelve las nuevas
+    antes = conexion.total_changes
+    conexion.executemany(
+        f'INSERT OR IGNORE INTO pedidos ({_columnas(COLUMNAS)}) VALUES ({_marcadores(COLUMNAS)})',
+        _filas_sql(df),
+    )
+    return conexion.total_changes - antes
+
+
+def _marcadores(valores):
+    return ', '.join('?' * len(valores))
+
+
+class MotorSQLite:
+    # Consultas sobre una base SQLite con los pedidos, resueltas con SQL y predicados indexados
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.version = 0
+        self._escritura = threading.Lock()
+        self._revisando = threading.Lock()
+        self._conexiones = queue.SimpleQueue()
+        self._series = None
+        self._resultados = (0, OrderedDict())
+        self._candado_resultados = threading.Lock()
+
+    @classmethod
+    def desde_csv(cls, ruta_csv, directorio=None, ruta=None):
+        # Abrir la base del CSV, reconstruyéndola si no corresponde a él o tiene lotes de otra ejecución,
+        # y volver a aplicar los lotes ya procesados del directorio de entrada
+        ruta = ruta or ruta_base(ruta_csv)
+        if not cls._vigente(ruta, ruta_csv):
+            with pd.read_csv(ruta_csv, encoding='utf-8', chunksize=TAMANO_BLOQUE) as bloques:
+                cls.construir(bloques, ruta, ruta_csv)
+        motor = cls(ruta)
+        for lote in lotes_procesados(directorio):
+            motor.agregar_lote(leer_lote(lote))
+        return motor
+
+    @staticmethod
+    def _vigente(ruta, ruta_csv):
+        if not os.path.exists(ruta):
+            return False
+        try:
+            conexion = sqlite3.connect(ruta)
+        except sqlite3.Error:
+            return False
+        try:
+            metadatos = dict(conexion.execute('SELECT clave, valor FROM metadatos').fetchall())
+            if int(metadatos.get('version', 0)) != VERSION_BASE or int(metadatos.get('lotes', 0)):
+                return False
+            # Los valores se guardan como texto; la firma del archivo se compara como enteros
+            origen = {clave: int(valor) if clave in ('tamano', 'mtime_ns', 'ctime_ns') else valor
+                      for clave, valor in metadatos.items() if clave in ('tamano', 'mtime_ns', 'ctime_ns', 'sha256')}
+            vigente = verificar_origen(origen, ruta_csv)
+            if vigente is None:
+                return False
+            if vigente != origen:
+                # El CSV sólo cambió de fecha: guardar la firma nueva para no volver a calcular el hash
+                with conexion:
+                    conexion.executemany('UPDATE metadatos SET valor = ? WHERE clave = ?',
+                                         [(str(valor), clave) for clave, valor in vigente.items()])
+            return True
+        except (sqlite3.Error, ValueError):
+            return False
+        finally:
+            conexion.close()
+
+    @classmethod
+    def construir(cls, bloques, ruta, ruta_csv=None):
+        # Crear la base a partir de bloques crudos del CSV; se escribe aparte y se reemplaza de una vez
+        temporal = ruta + '.tmp'
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        conexion = sqlite3.connect(temporal)
+        try:
+            # El archivo temporal no necesita diario ni escrituras sincrónicas: si la carga falla se descarta
+            for pragma in ('journal_mode=OFF', 'synchronous=OFF', 'temp_store=MEMORY', 'cache_size=-262144'):
+                conexion.execute(f'PRAGMA {pragma}')
+            columnas = ', '.join(f'"{columna}" {_tipo_sql(columna)}' for columna in COLUMNAS)
+            conexion.execute(f'CREATE TABLE pedidos ({columnas})')
+            conexion.execute('CREATE TABLE metadatos (clave TEXT PRIMARY KEY, valor TEXT)')
+            nombre, claves = INDICE_CLAVE
+            conexion.execute(f'CREATE UNIQUE INDEX {nombre} ON pedidos ({_columnas(claves)})')
+            for bloque in bloques:
+                _insertar(conexion, normalizar(bloque))
+            # Los demás índices se crean al final, más rápido que mantenerlos durante la carga
+            for nombre, columnas in INDICES.items():
+                conexion.execute(f'CREATE INDEX {nombre} ON pedidos ({_columnas(columnas)})')
+            metadatos = {'version': VERSION_BASE, 'lotes': 0}
+            if ruta_csv:
+                metadatos.update(origen_archivo(ruta_csv))
+            conexion.executemany('INSERT INTO metadatos VALUES (?, ?)', [(clave, str(valor)) for clave, valor in metadatos.items()])
+            conexion.execute('ANALYZE')
+            conexion.commit()
+            conexion.execute('PRAGMA journal_mode=WAL')
+        finally:
+            conexion.close()
+        os.replace(temporal, ruta)
+        return ruta
+
+    @contextmanager
+    def _conexion(self):
+        # Cada consulta toma una conexión libre del pool, que crece con las sesiones simultáneas
+        try:
+            conexion = self._conexiones.get_nowait()
+        except queue.Empty:
+            conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        try:
+            yield conexion
+        finally:
+            self._conexiones.put(conexion)
+
+    def _leer(self, sql, parametros=()):
+        with self._conexion() as conexion:
+            return pd.read_sql_query(sql, conexion, params=list(parametros))
+
+    def _valores(self, sql, parametros=()):
+        with self._conexion() as conexion:
+            return conexion.execute(sql, list(parametros)).fetchone()
+
+    def consultar(self, nombre, *argumentos):
+        if nombre not in CONSULTAS:
+            raise KeyError(nombre)
+        return getattr(self, nombre)(*argumentos)
+
+    def _por_version(self, clave, calcular):
+        # Las consultas que recorren toda la tabla sólo cambian al agregar un lote: se calculan una
+        # vez por versión y se guardan las MAXIMO_RESULTADOS usadas más recientemente
+        with self._candado_resultados:
+            version, resultados = self._resultados
+            if version != self.version:
+                version, resultados = self._resultados = (self.version, OrderedDict())
+            if clave in resultados:
+                resultados.move_to_end(clave)
+                return resultados[clave]
+        resultado = calcular()
+        with self._candado_resultados:
+            resultados[clave] = resultado
+            if len(resultados) > MAXIMO_RESULTADOS:
+                resultados.popitem(last=False)
+        return resultado
+
+    # Predicados de los filtros del tablero; devuelven la condición y sus parámetros
+
+    def _predicado_productos(self, productos):
+        if not productos:
+            return '1', []
+        return f'"Product Name" IN ({_marcadores(productos)})', list(productos)
+
+    def _predicado_fechas(self, anio=None, mes=None):
+        # Intervalos [desde, hasta) de 'Order Date', uno por año cuando sólo se elige el mes
+        if anio is None and mes is None:
+            return '1', []
+        if mes is None:
+            return '"Order Date" >= ? AND "Order Date" < ?', [f'{anio}-01-01', f'{anio + 1}-01-01']
+        if anio is None:
+            primero, ultimo = self._valores('SELECT MIN("Order Date"), MAX("Order Date") FROM pedidos')
+            anios = range(int(primero[:4]), int(ultimo[:4]) + 1) if primero else []
+        else:
+            anios = [anio]
+        intervalos, parametros = [], []
+        for actual in anios:
+            desde = np.datetime64(f'{actual}-{mes:02d}', 'M')
+            intervalos.append('("Order Date" >= ? AND "Order Date" < ?)')
+            parametros += [str(desde.astype('datetime64[D]')), str((desde + 1).astype('datetime64[D]'))]
+        return f'({" OR ".join(intervalos) or "0"})', parametros
+
+    # Consultas
+
+    def filas(self):
+        return self._por_version('filas', lambda: int(self._valores('SELECT COUNT(*) FROM pedidos')[0]))
+
+    def opciones_productos(self):
+        return self._por_version('opciones_productos', lambda: self._leer(
+            'SELECT DISTINCT "Product Name" FROM pedidos ORDER BY 1')['Product Name'].tolist())
+
+    def opciones_fechas(self):
+        return self._por_version('opciones_fechas', self._opciones_fechas)
+
+    def _opciones_fechas(self):
+        meses = self._leer('SELECT DISTINCT substr("Order Date", 1, 7) AS periodo FROM pedidos')['periodo']
+        return sorted({int(periodo[:4]) for periodo in meses}), sorted({int(periodo[5:]) for periodo in meses})
+
+    def _estadisticas_columna(self, columna):
+        # Suma, promedio, mediana exacta, desviación y varianza muestrales (ddof=1), mínimo y máximo
+        n, suma, media, minimo, maximo = self._valores(
+            f'SELECT COUNT("{columna}"), SUM("{columna}"), AVG("{columna}"), MIN("{columna}"), MAX("{columna}") FROM pedidos')
+        if not n:
+            return [0.0] + [float('nan')] * (len(ESTADISTICAS) - 1)
+        # La varianza se calcula en una segunda pasada sobre los desvíos, estable frente a la suma de cuadrados
+        m2 = self._valores(f'SELECT SUM(("{columna}" - ?) * ("{columna}" - ?)) FROM pedidos', (media, media))[0]
+        varianza = m2 / (n - 1) if n > 1 else float('nan')
+        centrales = self._leer(
+            f'SELECT "{columna}" AS valor FROM pedidos WHERE "{columna}" IS NOT NULL ORDER BY 1 LIMIT ? OFFSET ?',
+            (2 - n % 2, (n - 1) // 2))['valor']
+        return [suma, media, float(centrales.mean()), float(np.sqrt(varianza)), varianza, minimo, maximo]
+
+    def estadisticas(self):
+        return self._por_version('estadisticas', lambda: pd.DataFrame(
+            [[columna] + self._estadisticas_columna(columna) for columna in ['Sales', 'Profit']],
+            columns=['Categoria'] + ESTADISTICAS,
+        ))
+
+    def filas_productos(self, productos):
+        condicion, parametros = self._predicado_productos(productos)
+        return self._por_version(('filas_productos', tuple(productos)), lambda: int(
+            self._valores(f'SELECT COUNT(*) FROM pedidos WHERE {condicion}', parametros)[0]))
+
+    def dispersion(self, productos, modo):
+        # Con pocas filas se traen los pedidos; si no, la rejilla o la muestra se arman en la base
+        condicion, parametros = self._predicado_productos(productos)
+        filas = self.filas_productos(productos)
+        columnas = _columnas(COLUMNAS_DISPERSION)
+        if filas <= UMBRAL_FILAS:
+            return self._pedidos(f'SELECT {columnas} FROM pedidos WHERE {condicion} ORDER BY "Order Date", rowid', parametros), False
+        if modo == MODO_REJILLA:
+            return self._rejilla(condicion, parametros), True
+        if modo == MODO_MUESTRA:
+            return self._muestra(columnas, condicion, parametros, filas), False
+        raise ValueError(f"Modo de dispersión desconocido: {modo!r}")
+
+    def _pedidos(self, sql, parametros):
+        df = self._leer(sql, parametros)
+        if 'Order Date' in df.columns:
+            df['Order Date'] = pd.to_datetime(df['Order Date'], format='%Y-%m-%d')
+        return df
+
+    def _rejilla(self, condicion, parametros, celdas=CELDAS_REJILLA):
+        # Igual que agrupar_en_rejilla: celdas de igual ancho entre el mínimo y el máximo de cada eje
+        minimo_ventas, maximo_ventas, minimo_ganancias, maximo_ganancias = self._valores(
+            f'SELECT MIN("Sales"), MAX("Sales"), MIN("Profit"), MAX("Profit") FROM pedidos WHERE {condicion}', parametros)
+        ancho_ventas = (maximo_ventas - minimo_ventas) / celdas or 1.0
+        ancho_ganancias = (maximo_ganancias - minimo_ganancias) / celdas or 1.0
+        clave = (f'MIN(MAX(CAST(("Sales" - ?) / ? AS INTEGER), 0), {celdas - 1}) * {celdas} + '
+                 f'MIN(MAX(CAST(("Profit" - ?) / ? AS INTEGER), 0), {celdas - 1})')
+        celdas_ocupadas = self._leer(
+            f'SELECT {clave} AS celda, COUNT(*) AS filas, SUM("Sales") AS ventas, SUM("Profit") AS ganancias '
+            f'FROM pedidos WHERE {condicion} GROUP BY celda ORDER BY celda',
+            [minimo_ventas, ancho_ventas, minimo_ganancias, ancho_ganancias] + parametros)
+        return pd.DataFrame({
+            'Sales': celdas_ocupadas['ventas'] / celdas_ocupadas['filas'],
+            'Profit': celdas_ocupadas['ganancias'] / celdas_ocupadas['filas'],
+            'Rows': celdas_ocupadas['filas'],
+            'Total Sales': celdas_ocupadas['ventas'],
+            'Total Profit': celdas_ocupadas['ganancias'],
+        })
+
+    def _muestra(self, columnas, condicion, parametros, filas, tamano=UMBRAL_FILAS):
+        # Los extremos de cada eje más una muestra uniforme determinística por 'Row ID', que mantiene
+        # la proporción de cada producto sin traer todas las filas
+        extremos = max(1, tamano // 20)
+        fraccion = min(1.0, max(0, tamano - 4 * extremos) / max(1, filas))
+        subconsultas = [f'SELECT rowid FROM pedidos WHERE {condicion} ORDER BY "{columna}" {orden} LIMIT {extremos}'
+                        for columna in ('Sales', 'Profit') for orden in ('ASC', 'DESC')]
+        return self._pedidos(
+            f'SELECT {columnas} FROM pedidos WHERE {condicion} AND ('
+            f'{" OR ".join(f"rowid IN ({subconsulta})" for subconsulta in subconsultas)} '
+            f'OR ("Row ID" * 2654435761) % 4294967296 < ?) ORDER BY "Order Date", rowid',
+            parametros + parametros * len(subconsultas) + [int(fraccion * 4294967296)])
+
+    def top_productos(self, productos, n=TOP_PRODUCTOS):
+        condicion, parametros = self._predicado_productos(productos)
+        return tuple(
+            self._leer(f'SELECT "Product Name", SUM("{medida}") AS "{medida}" FROM pedidos WHERE {condicion} '
+                       f'GROUP BY "Product Name" ORDER BY 2 DESC LIMIT {n}', parametros)
+            for medida in ('Sales', 'Profit')
+        )
+
+    def total_fechas(self, anio, mes):
+        condicion, parametros = self._predicado_fechas(anio, mes)
+        ventas, ganancias = self._valores(f'SELECT TOTAL("Sales"), TOTAL("Profit") FROM pedidos WHERE {condicion}', parametros)
+        return float(ventas), float(ganancias)
+
+    def top_fechas(self, anio, mes, n=TOP_FECHAS):
+        condicion, parametros = self._predicado_fechas(anio, mes)
+        return tuple(
+            self._pedidos(f'SELECT "Order Date", SUM("{medida}") AS "{medida}" FROM pedidos WHERE {condicion} '
+                          f'GROUP BY "Order Date" ORDER BY 2 DESC LIMIT {n}', parametros)
+            for medida in ('Sales', 'Profit')
+        )
+
+    def _series_temporales(self):
+        # Las series derivadas necesitan toda la historia: se arman una vez por versión con las sumas por día
+        series = self._series
+        if series is None or series[0] != self.version:
+            version = self.version
+            sumas = ', '.join(f'SUM("{medida}") AS "{medida}"' for medida in MEDIDAS)
+            diarias = self._pedidos(f'SELECT "Order Date", {sumas} FROM pedidos GROUP BY "Order Date"', ())
+            series = self._series = (version, SeriesTemporales.desde_df(diarias))
+        return series[1]
+
+    def serie(self, frecuencia, indicador, anio, mes):
+        return self._series_temporales().serie(frecuencia, indicador, anio, mes)
+
+    def clientes_por_region(self):
+        por_region = self._leer('SELECT "Region" AS "Región", COUNT(DISTINCT "Customer Name") AS "Clientes Totales" '
+                                'FROM pedidos GROUP BY "Region" ORDER BY 1')
+        return por_region, int(self._valores('SELECT COUNT(DISTINCT "Customer Name") FROM pedidos')[0])
+
+    def totales_region_provincia(self, minimo, maximo):
+        return tuple(
+            self._leer(f'SELECT "{dimension}", SUM("Sales") AS "Sales", SUM("Profit") AS "Profit" FROM pedidos '
+                       f'WHERE "Sales" BETWEEN ? AND ? GROUP BY "{dimension}" ORDER BY 1', (minimo, maximo))
+            for dimension in ('Region', 'Province')
+        )
+
+    def totales_envios(self, anio, mes):
+        condicion, parametros = self._predicado_fechas(anio, mes)
+        return tuple(
+            self._leer(f'SELECT "{dimension}", SUM("{medida}") AS "{medida}" FROM pedidos WHERE {condicion} '
+                       f'GROUP BY "{dimension}" ORDER BY 2 DESC', parametros)
+            for dimension, medida in (('Customer Segment', 'Order Quantity'), ('Ship Mode', 'Shipping Cost'))
+        )
+
+    # Ingesta
+
+    def agregar_lote(self, crudo):
+        # Validar el lote e insertarlo; el índice único descarta los pares (Row ID, Order ID) repetidos
+        lote = validar_lote(crudo)
+        with self._escritura, self._conexion() as conexion:
+            with conexion:
+                nuevas = _insertar(conexion, lote)
+                if nuevas:
+                    conexion.execute("UPDATE metadatos SET valor = CAST(valor AS INTEGER) + 1 WHERE clave = 'lotes'")
+            if nuevas:
+                self.version += 1
+        return {'filas': len(lote), 'nuevas': nuevas, 'duplicadas': len(lote) - nuevas}
+
+    def revisar_directorio(self, directorio):
+        # Igual que EstadoDatos.revisar_directorio: sin esperar si otra sesión ya está revisando
+        if not os.path.isdir(directorio) or not self._revisando.acquire(blocking=False):
+            return []
+        try:
+            return procesar_directorio(directorio, self.agregar_lote)
+        finally:
+            self._revisando.release()
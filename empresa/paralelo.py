@@ -0,0 +1,256 @@
+# Agregaciones map-reduce en un pool de procesos sobre columnas mapeadas en memoria
+#
+# Las columnas necesarias se escriben una vez como archivos .npy (las dimensiones como
+# códigos enteros) y cada proceso las abre con mmap: los trabajadores sólo reciben la
+# ruta y el rango de filas de su partición, nunca un DataFrame serializado.
+#
+# Las filas agregadas después se escriben como otro segmento, sin reescribir los anteriores,
+# y todas las versiones de los datos comparten los segmentos comunes y un mismo pool de procesos.
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+
+# Dimensiones y medidas que se exportan como columnas mapeables
+DIMENSIONES = ['Region', 'Province', 'Customer Segment', 'Ship Mode', 'Product Name']
+MEDIDAS = ['Sales', 'Profit', 'Shipping Cost', 'Order Quantity']
+
+# Formas de particionar las filas
+POR_ANIO = 'anio'
+POR_BLOQUES = 'bloques'
+
+# Variables de entorno con la configuración por defecto
+VARIABLE_TRABAJADORES = 'EMPRESA_TRABAJADORES'
+VARIABLE_PARTICIONES = 'EMPRESA_PARTICIONES'
+
+# Filas a partir de las cuales las particiones se reparten en el pool; con menos, enviarlas a
+# otros procesos cuesta más que sumarlas en el proceso actual
+MINIMO_FILAS_POOL = 100_000
+
+# Segmentos (el exportado al principio y uno por cada anexado) a partir de los cuales se unen en uno
+MAXIMO_SEGMENTOS = 16
+
+# Columnas que se escriben en cada segmento
+COLUMNAS = DIMENSIONES + MEDIDAS + ['Year']
+
+# Pools de procesos por cantidad de trabajadores, compartidos por todos los agregadores del proceso
+_pools = {}
+_candado_pools = threading.Lock()
+
+
+def configuracion():
+    # Leer trabajadores y particiones del entorno; por defecto un trabajador por núcleo, y con 1
+    # trabajador todo se ejecuta en el proceso actual
+    trabajadores = int(os.environ.get(VARIABLE_TRABAJADORES, '0')) or os.cpu_count() or 1
+    particiones = int(os.environ.get(VARIABLE_PARTICIONES, '0'))
+    return trabajadores, particiones
+
+
+def ejecutor(trabajadores):
+    # Pool del proceso, creado la primera vez que se usa; 'spawn' evita heredar los hilos del servidor
+    with _candado_pools:
+        if trabajadores not in _pools:
+            _pools[trabajadores] = ProcessPoolExecutor(max_workers=trabajadores, mp_context=get_context('spawn'))
+        return _pools[trabajadores]
+
+
+class Segmento:
+    # Directorio con una columna por archivo .npy para un tramo de filas; si es temporal se borra
+    # cuando lo sueltan todos los almacenes que lo usan
+
+    def __init__(self, directorio, filas, temporal):
+        self.directorio = directorio
+        self.filas = filas
+        self.temporal = temporal
+        self.usos = 0
+        self._candado = threading.Lock()
+
+    def tomar(self):
+        with self._candado:
+            self.usos += 1
+
+    def soltar(self):
+        with self._candado:
+            self.usos -= 1
+            borrar = self.temporal and not self.usos
+        if borrar:
+            shutil.rmtree(self.directorio, True)
+
+
+def _soltar(segmentos):
+    for segmento in segmentos:
+        segmento.soltar()
+
+
+def _codigos(columna, categorias):
+    # Códigos de la columna en la lista de categorías del almacén; -1 en las filas sin valor
+    columna = columna.astype('category')
+    traduccion = np.append(pd.Index(categorias).get_indexer(columna.cat.categories), -1)
+    return traduccion[columna.cat.codes.to_numpy()].astype(np.int32)
+
+
+def _escribir(df, categorias, directorio=None):
+    # Escribir un segmento con las filas del DataFrame; sin directorio se usa uno temporal
+    temporal = directorio is None
+    if temporal:
+        directorio = tempfile.mkdtemp(prefix='empresa-columnas-')
+    os.makedirs(directorio, exist_ok=True)
+    for dimension in DIMENSIONES:
+        np.save(os.path.join(directorio, f'{dimension}.npy'), _codigos(df[dimension], categorias[dimension]))
+    for medida in MEDIDAS:
+        np.save(os.path.join(directorio, f'{medida}.npy'), df[medida].to_numpy(dtype=np.float64))
+    np.save(os.path.join(directorio, 'Year.npy'), df['Order Date'].dt.year.to_numpy(dtype=np.int16))
+    return Segmento(directorio, len(df), temporal)
+
+
+def _unir(segmentos):
+    # Copiar los segmentos en uno solo, temporal, en el mismo orden de filas
+    directorio = tempfile.mkdtemp(prefix='empresa-columnas-')
+    for nombre in COLUMNAS:
+        np.save(os.path.join(directorio, f'{nombre}.npy'),
+                np.concatenate([abrir_columna(segmento.directorio, nombre) for segmento in segmentos]))
+    return Segmento(directorio, sum(segmento.filas for segmento in segmentos), True)
+
+
+class AlmacenColumnas:
+    # Columnas exportadas en uno o más segmentos y las categorías de cada dimensión. Las categorías
+    # nuevas se agregan al final, así que los códigos ya escritos siguen valiendo al anexar filas
+
+    def __init__(self, segmentos, categorias):
+        self.segmentos = list(segmentos)
+        self.categorias = categorias
+        self.filas = sum(segmento.filas for segmento in self.segmentos)
+        for segmento in self.segmentos:
+            segmento.tomar()
+        # Los segmentos se sueltan al cerrar el almacén, al liberarlo o al terminar el proceso
+        self._soltar = weakref.finalize(self, _soltar, self.segmentos)
+
+    @classmethod
+    def exportar(cls, df, directorio=None):
+        # Escribir las columnas del DataFrame; un directorio indicado se conserva al cerrar
+        categorias = {dimension: df[dimension].astype('category').cat.categories.tolist() for dimension in DIMENSIONES}
+        return cls([_escribir(df, categorias, directorio)], categorias)
+
+    def anexar(self, df):
+        # Almacén con las filas del DataFrame al final: sólo se escriben esas filas y los segmentos
+        # existentes se comparten. Pasado MAXIMO_SEGMENTOS se unen todos en uno
+        categorias = {}
+        for dimension, conocidas in self.categorias.items():
+            presentes = set(conocidas)
+            categorias[dimension] = conocidas + [valor for valor in df[dimension].astype('category').cat.categories
+                                                 if valor not in presentes]
+        segmentos = self.segmentos + [_escribir(df, categorias)]
+        if len(segmentos) > MAXIMO_SEGMENTOS:
+            unido = _unir(segmentos)
+            segmentos[-1].tomar()
+            segmentos[-1].soltar()
+            segmentos = [unido]
+        return AlmacenColumnas(segmentos, categorias)
+
+    def cerrar(self):
+        # Soltar los segmentos; los temporales se borran cuando ningún otro almacén los usa
+        self._soltar()
+
+
+def abrir_columna(directorio, nombre):
+    # Abrir una columna en modo sólo lectura y mapeada en memoria
+    return np.load(os.path.join(directorio, f'{nombre}.npy'), mmap_mode='r')
+
+
+def particionar(almacen, por=POR_ANIO, particiones=0):
+    # Devolver las particiones (directorio del segmento, inicio, fin) de las filas
+    if por not in (POR_ANIO, POR_BLOQUES):
+        raise ValueError(f"Partición desconocida: {por!r}")
+    resultado = []
+    if por == POR_ANIO and not particiones:
+        # Las filas del CSV y las de cada lote están ordenadas por fecha, así que dentro de cada
+        # segmento cada año ocupa un rango contiguo
+        for segmento in almacen.segmentos:
+            anios = abrir_columna(segmento.directorio, 'Year')
+            cortes = np.flatnonzero(np.diff(anios)) + 1
+            limites = np.concatenate(([0], cortes, [segmento.filas]))
+            resultado += [(segmento.directorio, int(inicio), int(fin)) for inicio, fin in zip(limites[:-1], limites[1:]) if fin > inicio]
+        return resultado
+
+    # Bloques de igual tamaño sobre todas las filas, cortados también en los bordes de los segmentos
+    limites = np.linspace(0, almacen.filas, max(1, particiones) + 1).astype(np.int64)
+    desplazamiento = 0
+    for segmento in almacen.segmentos:
+        internos = limites[(limites > desplazamiento) & (limites < desplazamiento + segmento.filas)] - desplazamiento
+        bordes = np.concatenate(([0], internos, [segmento.filas]))
+        resultado += [(segmento.directorio, int(inicio), int(fin)) for inicio, fin in zip(bordes[:-1], bordes[1:]) if fin > inicio]
+        desplazamiento += segmento.filas
+    return resultado
+
+
+def agregar_particion(directorio, inicio, fin, dimension, tamano, medidas, rango=None):
+    # Paso map: sumar las medidas por código de dimensión dentro de una partición
+    codigos = abrir_columna(directorio, dimension)[inicio:fin]
+    # Las filas sin valor en la dimensión tienen código -1 y no entran en ningún grupo
+    seleccion = codigos >= 0
+    if rango is not None:
+        medida_filtro, minimo, maximo = rango
+        valores = abrir_columna(directorio, medida_filtro)[inicio:fin]
+        seleccion &= (valores >= minimo) & (valores <= maximo)
+    if seleccion.all():
+        seleccion = None
+    else:
+        codigos = codigos[seleccion]
+    sumas = {}
+    for medida in medidas:
+        valores = abrir_columna(directorio, medida)[inicio:fin]
+        if seleccion is not None:
+            valores = valores[seleccion]
+        sumas[medida] = np.bincount(codigos, weights=valores, minlength=tamano)
+    sumas['Rows'] = np.bincount(codigos, minlength=tamano)
+    return sumas
+
+
+class AgregadorParalelo:
+    # Ejecuta agregaciones por partición en un pool de procesos y combina los parciales
+
+    def __init__(self, almacen, trabajadores=None, particiones=None, por=POR_ANIO):
+        trabajadores_entorno, particiones_entorno = configuracion()
+        self.almacen = almacen
+        self.trabajadores = trabajadores_entorno if trabajadores is None else trabajadores
+        self.por = por
+        self.cantidad_particiones = particiones_entorno if particiones is None else particiones
+        self.particiones = particionar(almacen, por, self.cantidad_particiones)
+
+    def anexar(self, df):
+        # Agregador con las filas del DataFrame al final, que sólo escribe esas filas
+        return AgregadorParalelo(self.almacen.anexar(df), self.trabajadores, self.cantidad_particiones, self.por)
+
+    def agregar(self, dimension, medidas, rango=None):
+        # Sumar las medidas por dimensión, opcionalmente sólo en filas con la medida dentro de un rango
+        medidas = [medidas] if isinstance(medidas, str) else list(medidas)
+        categorias = self.almacen.categorias[dimension]
+        argumentos = [
+            (directorio, inicio, fin, dimension, len(categorias), medidas, rango)
+            for directorio, inicio, fin in self.particiones
+        ]
+        if self.trabajadores > 1 and len(argumentos) > 1 and self.almacen.filas >= MINIMO_FILAS_POOL:
+            parciales = list(ejecutor(self.trabajadores).map(agregar_particion, *zip(*argumentos)))
+        else:
+            parciales = [agregar_particion(*argumento) for argumento in argumentos]
+
+        # Paso reduce: sumar los vectores parciales (sin particiones quedan en cero), quitar las
+        # categorías sin filas y ordenar por nombre, porque las anexadas quedan al final
+        totales = {clave: sum((parcial[clave] for parcial in parciales), np.zeros(len(categorias)))
+                   for clave in medidas + ['Rows']}
+        presentes = totales['Rows'] > 0
+        resultado = pd.DataFrame({dimension: np.asarray(categorias, dtype=object)[presentes]})
+        for medida in medidas:
+            resultado[medida] = totales[medida][presentes]
+        return resultado.sort_values(dimension, kind='stable', ignore_index=True)
+
+    def cerrar(self):
+        # Soltar las columnas exportadas; el pool es del proceso y lo siguen usando los demás agregadores
+        self.almacen.cerrar()
@@ -0,0 +1,42 @@
+# Cálculos de cada sección del tablero, independientes de Streamlit
+#
+# Cada función recibe las estructuras ya construidas (cubo, índices, conjuntos) y los
+# valores de los widgets de su sección, y devuelve los DataFrames que se grafican.
+
+
+def top_productos(cubo, productos=None, n=10):
+    # Los n productos con más ventas y con más ganancias; sin selección se consideran todos
+    totales = cubo.consultar('Product Name', ['Sales', 'Profit'], {'Product Name': productos or None})
+    return totales[['Product Name', 'Sales']].nlargest(n, 'Sales'), totales[['Product Name', 'Profit']].nlargest(n, 'Profit')
+
+
+def top_fechas(series, anio=None, mes=None, n=50):
+    # Las n fechas con más ventas y con más ganancias dentro del mes y año seleccionados
+    return series.mejores_dias('Sales', n, anio, mes), series.mejores_dias('Profit', n, anio, mes)
+
+
+def clientes_por_region(clientes):
+    # Clientes distintos por región y total global, uniendo los conjuntos por provincia
+    return clientes.contar_por(1, 'Región'), clientes.contar()
+
+
+def totales_region_provincia(cubo, df, minimo, maximo, agregador=None):
+    # Ventas y ganancias por región y provincia de los pedidos con ventas en [minimo, maximo]
+    if cubo.cubre_rango('Sales', minimo, maximo):
+        return cubo.consultar('Region', ['Sales', 'Profit']), cubo.consultar('Province', ['Sales', 'Profit'])
+    if agregador is not None:
+        rango = ('Sales', minimo, maximo)
+        return agregador.agregar('Region', ['Sales', 'Profit'], rango), agregador.agregar('Province', ['Sales', 'Profit'], rango)
+    filtrado = df[df['Sales'].between(minimo, maximo)]
+    return (
+        filtrado.groupby('Region', observed=True)[['Sales', 'Profit']].sum().reset_index(),
+        filtrado.groupby('Province', observed=True)[['Sales', 'Profit']].sum().reset_index(),
+    )
+
+
+def totales_envios(cubo, anio=None, mes=None):
+    # Cantidad enviada por segmento y costo de envío por modo, ordenados de mayor a menor
+    filtros = {'Year': anio, 'Month': mes}
+    segmentos = cubo.consultar('Customer Segment', 'Order Quantity', filtros).sort_values(by='Order Quantity', ascending=False)
+    modos = cubo.consultar('Ship Mode', 'Shipping Cost', filtros).sort_values(by='Shipping Cost', ascending=False)
+    return segmentos, modos
@@ -0,0 +1,179 @@
+# Series temporales materializadas de ventas y ganancias
+#
+# Las sumas diarias se guardan en un calendario denso (un valor por día, también los días sin
+# pedidos) junto con sus sumas acumuladas, de modo que el total de cualquier intervalo de fechas
+# es una resta de dos posiciones. Como el calendario está ordenado, el filtro de año y mes es una
+# rebanada contigua por año (ver ventanas), calculada por aritmética de fechas en lugar de
+# recorrer o buscar filas; reemplaza a las rebanadas de filas que daba IndiceFechas. Las series
+# semanales y mensuales, las medias móviles y las variaciones interanuales se derivan de esas
+# sumas acumuladas y se guardan ya calculadas.
+# Agregar filas nuevas sólo recorre esas filas; lo demás se recalcula sobre el calendario,
+# cuyo tamaño depende de los días de historia y no de la cantidad de pedidos.
+import numpy as np
+import pandas as pd
+
+
+MEDIDAS = ['Sales', 'Profit']
+
+DIARIA = 'diaria'
+SEMANAL = 'semanal'
+MENSUAL = 'mensual'
+FRECUENCIAS = {DIARIA: 'Diaria', SEMANAL: 'Semanal', MENSUAL: 'Mensual'}
+
+VALOR = 'valor'
+MEDIA_MOVIL = 'media_movil'
+INTERANUAL = 'interanual'
+INDICADORES = {VALOR: 'Valor', MEDIA_MOVIL: 'Media móvil', INTERANUAL: 'Variación interanual'}
+
+# Períodos que promedia la media móvil de cada frecuencia
+VENTANAS = {DIARIA: 7, SEMANAL: 4, MENSUAL: 3}
+
+# Períodos hacia atrás con los que se compara la variación interanual; 364 días mantiene el día de la semana
+REZAGOS_ANUALES = {DIARIA: 364, SEMANAL: 52, MENSUAL: 12}
+
+
+def _semanas(dias):
+    # Número de semana contado desde el lunes 1970-01-05 (el 1970-01-01 fue jueves)
+    return (dias.astype(np.int64) + 3) // 7
+
+
+def _media_movil(valores, ventana):
+    # Media de los últimos `ventana` períodos; al principio se promedian los disponibles
+    acumuladas = np.concatenate(([0.0], np.cumsum(valores)))
+    fin = np.arange(1, len(valores) + 1)
+    inicio = np.maximum(fin - ventana, 0)
+    return (acumuladas[fin] - acumuladas[inicio]) / (fin - inicio)
+
+
+def _interanual(valores, rezago):
+    # Diferencia con el período de un año antes; sin historia suficiente queda en NaN
+    variacion = np.full(len(valores), np.nan)
+    if rezago < len(valores):
+        variacion[rezago:] = valores[rezago:] - valores[:-rezago]
+    return variacion
+
+
+class SeriesTemporales:
+    # Sumas diarias densas con sus acumuladas y las series derivadas por frecuencia
+
+    def __init__(self, medidas=MEDIDAS):
+        self.medidas = list(medidas)
+        self.inicio = None
+        self.diarias = {medida: np.zeros(0) for medida in self.medidas}
+        self.pedidos = np.zeros(0, dtype=np.int64)
+        self.acumuladas = {}
+        self.periodos = {}
+        self.derivadas = {}
+        self._recalcular()
+
+    @classmethod
+    def desde_df(cls, df, medidas=MEDIDAS):
+        return cls(medidas).agregar(df)
+
+    def __len__(self):
+        return len(self.pedidos)
+
+    @property
+    def dias(self):
+        if self.inicio is None:
+            return np.zeros(0, dtype='datetime64[D]')
+        return self.inicio + np.arange(len(self))
+
+    def copia(self):
+        # Copia independiente del calendario; su tamaño depende de los días, no de los pedidos
+        nueva = SeriesTemporales(self.medidas)
+        nueva.inicio = self.inicio
+        nueva.pedidos = self.pedidos.copy()
+        nueva.diarias = {medida: valores.copy() for medida, valores in self.diarias.items()}
+        nueva.acumuladas = dict(self.acumuladas)
+        nueva.periodos = dict(self.periodos)
+        nueva.derivadas = dict(self.derivadas)
+        return nueva
+
+    def agregar(self, df):
+        # Sumar filas nuevas al calendario, extendiéndolo si caen fuera de las fechas conocidas
+        if not len(df):
+            return self
+        dias = df['Order Date'].to_numpy().astype('datetime64[D]')
+        primero, ultimo = dias.min(), dias.max()
+        if self.inicio is None:
+            self.inicio = primero
+        antes = max(int((self.inicio - primero).astype(np.int64)), 0)
+        despues = max(int((ultimo - self.inicio).astype(np.int64)) + 1 - antes - len(self), 0)
+        if antes or despues:
+            self.inicio = min(self.inicio, primero)
+            self.pedidos = np.pad(self.pedidos, (antes, despues))
+            self.diarias = {medida: np.pad(valores, (antes, despues)) for medida, valores in self.diarias.items()}
+
+        posiciones = (dias - self.inicio).astype(np.int64)
+        self.pedidos += np.bincount(posiciones, minlength=len(self))
+        for medida in self.medidas:
+            pesos = df[medida].to_numpy(dtype=np.float64)
+            self.diarias[medida] += np.bincount(posiciones, weights=pesos, minlength=len(self))
+        self._recalcular()
+        return self
+
+    def _recalcular(self):
+        # Acumuladas diarias, límites de cada período y series derivadas por frecuencia
+        self.acumuladas = {medida: np.concatenate(([0.0], np.cumsum(valores))) for medida, valores in self.diarias.items()}
+        dias = self.dias
+        claves = {DIARIA: dias.astype(np.int64), SEMANAL: _semanas(dias), MENSUAL: dias.astype('datetime64[M]').astype(np.int64)}
+        for frecuencia, clave in claves.items():
+            inicios = np.flatnonzero(np.concatenate(([True], clave[1:] != clave[:-1]))) if len(clave) else np.zeros(0, dtype=np.int64)
+            limites = np.append(inicios, len(dias))
+            if frecuencia == SEMANAL:
+                fechas = (clave[inicios] * 7 - 3).astype('datetime64[D]')
+            elif frecuencia == MENSUAL:
+                fechas = clave[inicios].astype('datetime64[M]').astype('datetime64[D]')
+            else:
+                fechas = dias
+            self.periodos[frecuencia] = (limites, fechas)
+            for medida, acumuladas in self.acumuladas.items():
+                valores = acumuladas[limites[1:]] - acumuladas[limites[:-1]]
+                self.derivadas[frecuencia, VALOR, medida] = valores
+                self.derivadas[frecuencia, MEDIA_MOVIL, medida] = _media_movil(valores, VENTANAS[frecuencia])
+                self.derivadas[frecuencia, INTERANUAL, medida] = _interanual(valores, REZAGOS_ANUALES[frecuencia])
+
+    def ventanas(self, anio=None, mes=None):
+        # Intervalos [inicio, fin) de posiciones del calendario que cumplen el filtro de año y mes
+        if self.inicio is None:
+            return []
+        if anio is None and mes is None:
+            return [(0, len(self))]
+        primero = self.inicio.astype('datetime64[Y]').astype(int) + 1970
+        ultimo = (self.inicio + len(self) - 1).astype('datetime64[Y]').astype(int) + 1970
+        anios = range(primero, ultimo + 1) if anio is None else [anio]
+        ventanas = []
+        for actual in anios:
+            if mes is None:
+                desde, hasta = np.datetime64(f'{actual}-01-01'), np.datetime64(f'{actual + 1}-01-01')
+            else:
+                desde = np.datetime64(f'{actual}-{mes:02d}', 'M')
+                desde, hasta = desde.astype('datetime64[D]'), (desde + 1).astype('datetime64[D]')
+            inicio = min(max(int((desde - self.inicio).astype(np.int64)), 0), len(self))
+            fin = min(max(int((hasta - self.inicio).astype(np.int64)), 0), len(self))
+            if inicio < fin:
+                ventanas.append((inicio, fin))
+        return ventanas
+
+    def total(self, medida, anio=None, mes=None):
+        # Suma de la medida en el filtro, con dos lecturas de las acumuladas por intervalo
+        acumuladas = self.acumuladas[medida]
+        return float(sum(acumuladas[fin] - acumuladas[inicio] for inicio, fin in self.ventanas(anio, mes)))
+
+    def serie(self, frecuencia=DIARIA, indicador=VALOR, anio=None, mes=None):
+        # Períodos que empiezan dentro del filtro, con el indicador pedido para cada medida
+        limites, fechas = self.periodos[frecuencia]
+        posiciones = [np.arange(*np.searchsorted(limites[:-1], ventana)) for ventana in self.ventanas(anio, mes)]
+        posiciones = np.concatenate(posiciones) if posiciones else np.zeros(0, dtype=np.int64)
+        datos = {'Order Date': fechas[posiciones].astype('datetime64[us]')}
+        for medida in self.medidas:
+            datos[medida] = self.derivadas[frecuencia, indicador, medida][posiciones]
+        return pd.DataFrame(datos)
+
+    def mejores_dias(self, medida, n=50, anio=None, mes=None):
+        # Los n días con pedidos de mayor valor dentro del filtro
+        diaria = self.serie(DIARIA, VALOR, anio, mes)
+        con_pedidos = np.concatenate([self.pedidos[inicio:fin] for inicio, fin in self.ventanas(anio, mes)] or [self.pedidos[:0]]) > 0
+        diaria = diaria[con_pedidos]
+        return diaria[['Order Date', medida]].sort_values(by=medida, ascending=False).head(n)
@@ -0,0 +1,187 @@
+# Tablas con estilo del tablero renderizadas a HTML una sola vez por contenido
+#
+# EstiloTabla reúne la definición visual compartida por las tablas (propiedades de celda,
+# barras, resaltado del máximo, formatos y estilos de la tabla) y devuelve el HTML ya
+# renderizado. El HTML se guarda en una caché del proceso cuya clave es una huella del
+# contenido del DataFrame (valores, índice, columnas y tipos) junto con la definición del
+# estilo, de modo que una reejecución con los mismos datos no vuelve a pasar por Styler.
+#
+# Styler arma un diccionario por celda y una regla CSS por celda, lo que se vuelve lento
+# con muchas filas. Por encima de UMBRAL_FILAS_TABLA se usa un renderizador vectorizado que
+# calcula las barras y el máximo por columna con numpy y deja los estilos en una sola hoja
+# de estilos por tabla. Los textos de las celdas salen de la misma conversión que usa Styler,
+# así que los dos caminos muestran los mismos valores.
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.io.formats.style import Styler
+
+
+# Propiedades de cada celda y colores compartidos por todas las tablas
+PROPIEDADES_CELDA = {'text-align': 'center', 'font-size': '18px'}
+COLOR_BARRA = '#83B7E2'
+COLOR_MAXIMO = '#ECF3FD'
+
+# Estilos de la tabla: encabezados, bordes, filas y celdas al pasar el puntero
+ESTILOS_TABLA = [
+    {'selector': 'th', 'props': [('background-color', '#ECF3FD'), ('color', '#000000'),
+                                 ('font-size', '18px'), ('border', '1px solid #000000')]},
+    {'selector': 'td', 'props': [('border', '1px solid #000000'), ('color', 'black')]},
+    {'selector': 'tr:hover', 'props': [('background-color', '#000000')]},
+    {'selector': 'tr:nth-child(even)', 'props': [('background-color', '#EDF3FD')]},
+    {'selector': 'tr:nth-child(odd)', 'props': [('background-color', '#EDF3FD')]},
+    {'selector': 'td:hover', 'props': [('background-color', '#F58518'), ('color', 'White')]},
+]
+
+# Filas a partir de las cuales se usa el renderizador vectorizado en lugar de Styler
+UMBRAL_FILAS_TABLA = 500
+
+# Cantidad máxima de tablas renderizadas que se guardan en la caché del proceso
+MAXIMO_TABLAS = 64
+
+
+def huella_df(df):
+    # Huella del contenido: valores e índice fila por fila, nombres de columnas e índice y tipos
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(repr((list(df.columns), list(df.index.names), [str(tipo) for tipo in df.dtypes])).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CacheHtml:
+    # HTML renderizado por clave, descartando el usado hace más tiempo al llenarse
+
+    def __init__(self, maximo=MAXIMO_TABLAS):
+        self.maximo = maximo
+        self._entradas = OrderedDict()
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave, renderizar):
+        with self._candado:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave]
+        # Se renderiza fuera del candado; si dos sesiones coinciden, ambas producen el mismo HTML
+        contenido = renderizar()
+        with self._candado:
+            self.fallos += 1
+            self._entradas[clave] = contenido
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+        return contenido
+
+
+# Caché compartida por todas las sesiones del proceso
+cache_html = CacheHtml()
+
+
+def _formateador(formato=None):
+    # Función con que Styler convierte un valor en texto: el formato indicado o, sin formato, los
+    # flotantes con la precisión de styler.format.precision y el resto con str(); no escapa HTML
+    if isinstance(formato, str):
+        return formato.format
+    if callable(formato):
+        return formato
+    precision = pd.get_option('styler.format.precision')
+
+    def formatear(valor):
+        if pd.api.types.is_float(valor) or pd.api.types.is_complex(valor):
+            return f'{valor:.{precision}f}'
+        return str(valor)
+    return formatear
+
+
+def _css(propiedades):
+    return '; '.join(f'{nombre}: {valor}' for nombre, valor in propiedades)
+
+
+def _limites_barra(valores):
+    # Inicio y fin de cada barra en porcentaje del ancho, alineadas en el cero como Styler.bar(align='mid')
+    finitos = valores[np.isfinite(valores)]
+    if not len(finitos):
+        return np.zeros(len(valores)), np.zeros(len(valores))
+    bajo, alto = min(finitos.min(), 0.0), max(finitos.max(), 0.0)
+    rango = alto - bajo or 1.0
+    cero = abs(bajo) / rango * 100
+    posicion = np.nan_to_num((valores - bajo) / rango * 100, nan=cero)
+    return np.minimum(cero, posicion), np.maximum(cero, posicion)
+
+
+class EstiloTabla:
+    # Definición de estilo de una tabla: columnas con barra y formato de cada columna
+
+    def __init__(self, barras=(), formatos=None, propiedades=PROPIEDADES_CELDA, estilos=ESTILOS_TABLA,
+                 color_barra=COLOR_BARRA, color_maximo=COLOR_MAXIMO):
+        self.barras = list(barras)
+        self.formatos = dict(formatos or {})
+        self.propiedades = dict(propiedades)
+        self.estilos = estilos
+        self.color_barra = color_barra
+        self.color_maximo = color_maximo
+        self.clave = repr((self.barras, sorted(self.formatos.items()), sorted(self.propiedades.items()),
+                           estilos, color_barra, color_maximo))
+
+    def styler(self, df, uuid=None):
+        # Styler de pandas con la definición compartida
+        return (Styler(df, uuid=uuid)
+                .set_properties(**self.propiedades)
+                .bar(subset=self.barras, color=self.color_barra)
+                .highlight_max(axis=0, color=self.color_maximo)
+                .format(self.formatos)
+                .set_table_styles(self.estilos))
+
+    def html(self, df, vectorizado=None):
+        # HTML de la tabla, renderizado sólo la primera vez que se ve este contenido con este estilo
+        if vectorizado is None:
+            vectorizado = len(df) > UMBRAL_FILAS_TABLA
+        clave = hashlib.blake2b(f'{huella_df(df)}|{self.clave}|{vectorizado}'.encode('utf-8'), digest_size=8).hexdigest()
+        renderizar = self.html_vectorizado if vectorizado else self.html_styler
+        return cache_html.obtener(clave, lambda: renderizar(df, clave))
+
+    def html_styler(self, df, uuid=None):
+        return self.styler(df, uuid).to_html()
+
+    def html_vectorizado(self, df, uuid=None):
+        # HTML equivalente al de Styler construido por columnas: las barras y el máximo se calculan
+        # con numpy y cada celda sólo lleva una variable CSS con su barra y una clase si es el máximo
+        tabla = f'T_{uuid or huella_df(df)[:10]}'
+        reglas = [f'#{tabla} td, #{tabla} th {{ {_css(self.propiedades.items())} }}',
+                  f'#{tabla} td {{ background-image: var(--barra, none); }}',
+                  f'#{tabla} td.maximo {{ background-color: {self.color_maximo}; }}']
+        reglas += [f"#{tabla} {estilo['selector']} {{ {_css(estilo['props'])} }}" for estilo in self.estilos]
+
+        celdas = []
+        for columna in df.columns:
+            serie = df[columna]
+            # Los mismos valores que Styler toma de itertuples(), convertidos con su misma función
+            formatear = _formateador(self.formatos.get(columna))
+            textos = np.array([str(formatear(valor)) for valor in serie], dtype=object)
+            atributos = np.full(len(serie), '', dtype=object)
+            if pd.api.types.is_numeric_dtype(serie):
+                valores = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+                if columna in self.barras:
+                    inicio, fin = _limites_barra(valores)
+                    atributos = atributos + [
+                        f' style="--barra: linear-gradient(90deg, transparent {a:.1f}%, {self.color_barra} {a:.1f}%, '
+                        f'{self.color_barra} {b:.1f}%, transparent {b:.1f}%)"' for a, b in zip(inicio, fin)]
+                if np.isfinite(valores).any():
+                    atributos = np.where(valores == np.nanmax(valores), atributos + ' class="maximo"', atributos)
+            celdas.append('<td' + atributos + '>' + textos + '</td>')
+
+        formatear = _formateador()
+        indices = ['<th>' + str(formatear(valor)) + '</th>' for valor in df.index]
+        filas = ['<tr>' + ''.join(fila) + '</tr>' for fila in zip(indices, *celdas)]
+        esquina = str(formatear(df.index.name)) if df.index.name is not None else '&nbsp;'
+        encabezado = '<tr><th>' + esquina + '</th>' + ''.join(f'<th>{formatear(columna)}</th>' for columna in df.columns) + '</tr>'
+        return (f'<style type="text/css">\n' + '\n'.join(reglas) + '\n</style>\n'
+                f'<table id="{tabla}"><thead>{encabezado}</thead><tbody>{"".join(filas)}</tbody></table>')
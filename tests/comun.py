@@ -0,0 +1,64 @@
+# Utilidades compartidas por las pruebas de la ingesta y de los motores de consulta
+import os
+
+import numpy as np
+import pandas as pd
+
+from empresa.dispersion import MODO_REJILLA
+
+
+RUTA_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Empresa.CSV')
+
+
+def consultas(productos):
+    # Consultas del tablero con filtros por defecto y con filtros de productos, fechas y ventas
+    elegidos = tuple(productos[:5])
+    return [
+        ('filas', ()),
+        ('opciones_productos', ()),
+        ('opciones_fechas', ()),
+        ('estadisticas', ()),
+        ('filas_productos', ((),)),
+        ('filas_productos', (elegidos,)),
+        ('dispersion', ((), MODO_REJILLA)),
+        ('dispersion', (elegidos, MODO_REJILLA)),
+        ('top_productos', ((),)),
+        ('top_productos', (elegidos,)),
+        ('total_fechas', (None, None)),
+        ('total_fechas', (2009, 1)),
+        ('top_fechas', (None, None)),
+        ('top_fechas', (2011, None)),
+        ('serie', ('semanal', 'media_movil', None, None)),
+        ('serie', ('mensual', 'interanual', 2012, None)),
+        ('clientes_por_region', ()),
+        ('totales_region_provincia', (0, 100000)),
+        ('totales_region_provincia', (100, 5000)),
+        ('totales_envios', (None, None)),
+        ('totales_envios', (2012, 5)),
+    ]
+
+
+def iguales(a, b):
+    # Comparar resultados de consultas: DataFrames por columna (los números con tolerancia) y
+    # tuplas elemento por elemento
+    if isinstance(a, tuple):
+        return isinstance(b, tuple) and len(a) == len(b) and all(iguales(x, y) for x, y in zip(a, b))
+    if isinstance(a, pd.Series):
+        return iguales(a.reset_index(), b.reset_index())
+    if isinstance(a, pd.DataFrame):
+        a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+        if list(a.columns) != list(b.columns) or len(a) != len(b):
+            return False
+        for columna in a.columns:
+            x, y = a[columna], b[columna]
+            if pd.api.types.is_numeric_dtype(x) and pd.api.types.is_numeric_dtype(y):
+                if not np.allclose(x.to_numpy(float, na_value=np.nan), y.to_numpy(float, na_value=np.nan), rtol=1e-6, equal_nan=True):
+                    return False
+            elif not (x.astype(str).to_numpy() == y.astype(str).to_numpy()).all():
+                return False
+        return True
+    if isinstance(a, float):
+        return bool(np.isclose(a, b, rtol=1e-9, equal_nan=True))
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return bool(np.array_equal(a, b))
+    return a == b
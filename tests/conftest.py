@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from empresa.carga import normalizar
+from tests.comun import RUTA_CSV
+
+
+@pytest.fixture(scope='session')
+def crudo_sesion():
+    return pd.read_csv(RUTA_CSV, encoding='utf-8')
+
+
+@pytest.fixture
+def crudo(crudo_sesion):
+    # Empresa.CSV tal como se lee de disco, sin normalizar; cada prueba recibe su propia copia
+    return crudo_sesion.copy()
+
+
+@pytest.fixture(scope='session')
+def datos(crudo_sesion):
+    # Empresa.CSV normalizado como lo carga el tablero; las pruebas no deben modificarlo
+    return normalizar(crudo_sesion)
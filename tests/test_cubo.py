@@ -0,0 +1,68 @@
+# Pruebas del cubo de sumas parciales: mismas sumas que un groupby de pandas sobre los pedidos
+import numpy as np
+import pandas as pd
+import pytest
+
+from empresa.cubo import DIMENSIONES, FILAS, MEDIDAS, CuboVentas
+from tests.comun import iguales
+
+
+@pytest.fixture(scope='module')
+def pedidos(datos):
+    # Pedidos con las columnas de año y mes que usa el cubo
+    return datos.assign(Year=datos['Order Date'].dt.year, Month=datos['Order Date'].dt.month)
+
+
+def _agrupado(pedidos, por, medidas=MEDIDAS):
+    return pedidos.groupby(por, observed=True)[medidas].sum().reset_index()
+
+
+@pytest.mark.parametrize('por', [['Year'], ['Region', 'Province'], ['Customer Segment'], ['Year', 'Month', 'Ship Mode'], ['Product Name']])
+def test_consultar_igual_a_groupby(datos, pedidos, por):
+    cubo = CuboVentas.desde_df(datos)
+    assert iguales(cubo.consultar(por), _agrupado(pedidos, por))
+
+
+def test_consultar_con_filtros(datos, pedidos):
+    cubo = CuboVentas.desde_df(datos)
+    productos = list(pedidos['Product Name'].cat.categories[:10])
+    filtrados = pedidos[(pedidos['Year'] == 2011) & pedidos['Product Name'].isin(productos)]
+    resultado = cubo.consultar('Product Name', ['Sales', 'Profit'], {'Year': 2011, 'Product Name': productos, 'Month': None})
+    assert iguales(resultado, _agrupado(filtrados, ['Product Name'], ['Sales', 'Profit']))
+
+    # Sin dimensiones se devuelve el total de cada medida
+    totales = cubo.consultar([], filtros={'Region': ['West', 'Ontario']})
+    assert totales.to_dict() == pytest.approx(pedidos[pedidos['Region'].isin(['West', 'Ontario'])][MEDIDAS].sum().to_dict())
+
+
+def test_celdas_unicas_y_filas(datos):
+    cubo = CuboVentas.desde_df(datos)
+    assert not cubo.celdas.duplicated(DIMENSIONES).any()
+    assert cubo.celdas[FILAS].sum() == len(datos)
+    assert len(cubo) < len(datos)
+
+
+def test_cubre_rango(datos):
+    cubo = CuboVentas.desde_df(datos)
+    bajo, alto = datos['Sales'].min(), datos['Sales'].max()
+    assert cubo.cubre_rango('Sales', 0, 100_000)
+    assert cubo.cubre_rango('Sales', bajo, alto)
+    assert not cubo.cubre_rango('Sales', bajo + 1, alto)
+    assert not cubo.cubre_rango('Sales', bajo, alto - 1)
+
+
+def test_agregar_y_compactar(datos, pedidos):
+    # Las celdas agregadas pueden repetir claves hasta compactar; las sumas no cambian
+    mitad = len(datos) // 2
+    cubo = CuboVentas.desde_df(datos.iloc[:mitad])
+    cubo.agregar(datos.iloc[mitad:].reset_index(drop=True))
+    entero = CuboVentas.desde_df(datos)
+
+    assert iguales(cubo.consultar(['Region', 'Province']), _agrupado(pedidos, ['Region', 'Province']))
+    assert cubo.rangos == entero.rangos
+    cubo.compactar()
+    assert cubo.pendientes == 0
+    assert len(cubo) == len(entero)
+    assert not cubo.celdas.duplicated(DIMENSIONES).any()
+    assert iguales(cubo.consultar(['Year', 'Month']), _agrupado(pedidos, ['Year', 'Month']))
+    assert np.isclose(cubo.celdas['Sales'].sum(), pedidos['Sales'].sum())
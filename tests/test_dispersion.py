@@ -0,0 +1,66 @@
+# Pruebas de la reducción del gráfico de dispersión: la rejilla conserva los totales de pandas y la
+# muestra conserva los extremos
+import numpy as np
+import pandas as pd
+import pytest
+
+from empresa.dispersion import (
+    COLUMNAS_DISPERSION,
+    MODO_MUESTRA,
+    MODO_REJILLA,
+    agrupar_en_rejilla,
+    preparar_dispersion,
+)
+
+
+def test_bajo_el_umbral_envia_cada_pedido(datos):
+    resultado, agregada = preparar_dispersion(datos, umbral=len(datos))
+    assert not agregada
+    pd.testing.assert_frame_equal(resultado, datos[COLUMNAS_DISPERSION])
+
+
+@pytest.mark.parametrize('celdas', [1, 10, 80])
+def test_rejilla_conserva_totales(datos, celdas):
+    rejilla = agrupar_en_rejilla(datos, celdas)
+    assert len(rejilla) <= celdas * celdas
+    assert rejilla['Rows'].sum() == len(datos)
+    assert rejilla['Total Sales'].sum() == pytest.approx(datos['Sales'].sum())
+    assert rejilla['Total Profit'].sum() == pytest.approx(datos['Profit'].sum())
+    assert np.allclose(rejilla['Sales'] * rejilla['Rows'], rejilla['Total Sales'])
+    assert rejilla['Sales'].between(datos['Sales'].min(), datos['Sales'].max()).all()
+
+
+def test_rejilla_igual_a_groupby_por_celda(datos):
+    # Con celdas de igual ancho, cada celda suma lo mismo que un groupby sobre los mismos cortes
+    celdas = 10
+    rejilla = agrupar_en_rejilla(datos, celdas)
+    cortes = {}
+    for columna in ('Sales', 'Profit'):
+        valores = datos[columna]
+        ancho = (valores.max() - valores.min()) / celdas
+        cortes[columna] = ((valores - valores.min()) / ancho).astype(np.int64).clip(0, celdas - 1)
+    esperado = datos.groupby([cortes['Sales'], cortes['Profit']])['Sales'].agg(['size', 'sum']).reset_index(drop=True)
+    assert sorted(rejilla['Rows'].tolist()) == sorted(esperado['size'].tolist())
+    assert np.allclose(np.sort(rejilla['Total Sales'].to_numpy()), np.sort(esperado['sum'].to_numpy()))
+
+
+def test_preparar_elige_el_modo(datos):
+    rejilla, agregada = preparar_dispersion(datos, umbral=1000, modo=MODO_REJILLA)
+    assert agregada and rejilla['Rows'].sum() == len(datos)
+    with pytest.raises(ValueError):
+        preparar_dispersion(datos, umbral=1000, modo='otro')
+
+
+def test_muestra_conserva_extremos(datos):
+    muestra, agregada = preparar_dispersion(datos, umbral=1000, modo=MODO_MUESTRA)
+    assert not agregada
+    assert list(muestra.columns) == COLUMNAS_DISPERSION
+    assert len(muestra) == pytest.approx(1000, rel=0.1)
+    for columna in ('Sales', 'Profit'):
+        assert muestra[columna].max() == datos[columna].max()
+        assert muestra[columna].min() == datos[columna].min()
+
+    # Cada punto es un pedido real, sin repetir
+    originales = datos[COLUMNAS_DISPERSION].reset_index(drop=True)
+    assert not muestra.index.duplicated().any()
+    pd.testing.assert_frame_equal(muestra, originales.loc[muestra.index])
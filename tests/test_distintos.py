@@ -0,0 +1,72 @@
+# Pruebas del conteo de clientes distintos: HyperLogLog dentro de su error y conjuntos exactos
+import numpy as np
+import pandas as pd
+import pytest
+
+from empresa.distintos import MODO_EXACTO, MODO_HLL, DistintosPorGrupo, HyperLogLog
+
+
+# Error tolerado: unas cuatro veces el error estándar de 1,04 / sqrt(2^14)
+TOLERANCIA_HLL = 0.035
+
+
+@pytest.fixture
+def df():
+    # Clientes repartidos en provincias de dos regiones; muchos compran en varias provincias
+    generador = np.random.default_rng(11)
+    filas = 60_000
+    provincias = {'Alberta': 'West', 'Manitoba': 'Prarie', 'Ontario': 'Ontario', 'Quebec': 'Quebec', 'Yukon': 'Yukon'}
+    provincia = generador.choice(list(provincias), size=filas)
+    return pd.DataFrame({
+        'Province': pd.Categorical(provincia),
+        'Region': pd.Categorical([provincias[nombre] for nombre in provincia]),
+        'Customer Name': [f'Cliente {numero}' for numero in generador.integers(0, 40_000, size=filas)],
+    })
+
+
+@pytest.mark.parametrize('cantidad', [100, 5_000, 200_000])
+def test_hll_dentro_del_error(cantidad):
+    hashes = pd.util.hash_array(np.array([f'Cliente {numero}' for numero in range(cantidad)], dtype=object))
+    hll = HyperLogLog().agregar(np.concatenate([hashes, hashes[: cantidad // 2]]))
+    assert abs(hll.contar() - cantidad) <= TOLERANCIA_HLL * cantidad
+
+
+def test_hll_union_igual_a_una_pasada():
+    hashes = pd.util.hash_array(np.array([f'Cliente {numero}' for numero in range(30_000)], dtype=object))
+    unido = HyperLogLog().agregar(hashes[:20_000]).fusionar(HyperLogLog().agregar(hashes[10_000:]))
+    assert unido.contar() == HyperLogLog().agregar(hashes).contar()
+    with pytest.raises(ValueError):
+        HyperLogLog(12).fusionar(HyperLogLog(14))
+
+
+def test_exacto_igual_a_nunique(df):
+    distintos = DistintosPorGrupo.desde_df(df, ['Province', 'Region'], modo=MODO_EXACTO)
+    assert distintos.contar() == df['Customer Name'].nunique()
+
+    por_region = distintos.contar_por(1, 'Region').set_index('Region')['Clientes Totales']
+    esperado = df.groupby('Region', observed=True)['Customer Name'].nunique()
+    assert por_region.to_dict() == esperado.to_dict()
+
+
+def test_hll_por_grupo_cerca_del_exacto(df):
+    distintos = DistintosPorGrupo.desde_df(df, ['Province', 'Region'], modo=MODO_HLL)
+    exacto = df['Customer Name'].nunique()
+    assert abs(distintos.contar() - exacto) <= TOLERANCIA_HLL * exacto
+
+    por_region = distintos.contar_por(1, 'Region').set_index('Region')['Clientes Totales']
+    for region, cantidad in df.groupby('Region', observed=True)['Customer Name'].nunique().items():
+        assert abs(por_region[region] - cantidad) <= TOLERANCIA_HLL * cantidad
+
+
+@pytest.mark.parametrize('modo', [MODO_EXACTO, MODO_HLL])
+def test_agregar_por_lotes_igual_a_construir(df, modo):
+    entero = DistintosPorGrupo.desde_df(df, ['Province', 'Region'], modo=modo)
+    primero = por_lotes = DistintosPorGrupo.desde_df(df.iloc[:20_000], ['Province', 'Region'], modo=modo)
+    anterior = primero.contar()
+    for inicio in range(20_000, len(df), 10_000):
+        por_lotes = por_lotes.copia().agregar(df.iloc[inicio:inicio + 10_000])
+
+    assert por_lotes.contar() == entero.contar()
+    assert sorted(por_lotes.conjuntos) == sorted(entero.conjuntos)
+    # La copia no modifica los conjuntos de la versión de la que sale
+    assert primero.contar() == anterior < por_lotes.contar()
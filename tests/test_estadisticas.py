@@ -0,0 +1,141 @@
+# Pruebas del motor de estadísticas: cota de error del sketch y fusión de momentos de Chan
+import numpy as np
+import pandas as pd
+import pytest
+
+from empresa.estadisticas import (
+    MODO_APROXIMADO,
+    MODO_AUTO,
+    MODO_EXACTO,
+    AcumuladorEstadisticas,
+    SketchCuantiles,
+    acumular_archivos,
+    acumular_csv,
+    fusionar_acumuladores,
+    tabla_estadisticas,
+)
+
+
+@pytest.fixture
+def valores():
+    # Montos con la forma de Sales y Profit: colas largas, negativos y algunos ceros
+    generador = np.random.default_rng(7)
+    montos = generador.lognormal(mean=6, sigma=2, size=20_000) * generador.choice([-1, 1], size=20_000, p=[0.3, 0.7])
+    montos[::500] = 0.0
+    return montos
+
+
+@pytest.mark.parametrize('error_relativo', [0.005, 0.02])
+def test_sketch_respeta_error_relativo(valores, error_relativo):
+    sketch = SketchCuantiles(error_relativo)
+    sketch.agregar(valores)
+    ordenados = np.sort(valores)
+    for q in np.linspace(0, 1, 101):
+        exacto = ordenados[int(np.floor(q * (len(ordenados) - 1)))]
+        assert abs(sketch.cuantil(q) - exacto) <= error_relativo * abs(exacto) * (1 + 1e-9)
+
+
+def test_sketch_fusionado_igual_al_de_una_pasada(valores):
+    entero = SketchCuantiles()
+    entero.agregar(valores)
+    fusionado = SketchCuantiles()
+    for bloque in np.array_split(valores, 7):
+        parte = SketchCuantiles()
+        parte.agregar(bloque)
+        fusionado.fusionar(parte)
+    assert fusionado.n == entero.n
+    assert [fusionado.cuantil(q) for q in (0.1, 0.5, 0.9)] == [entero.cuantil(q) for q in (0.1, 0.5, 0.9)]
+
+
+def test_sketch_no_fusiona_errores_distintos():
+    with pytest.raises(ValueError):
+        SketchCuantiles(0.01).fusionar(SketchCuantiles(0.02))
+
+
+@pytest.mark.parametrize('bloques', [1, 3, 50])
+def test_fusion_de_chan_igual_a_pandas(valores, bloques):
+    # Bloques de tamaños desiguales acumulados por separado y fusionados
+    cortes = np.sort(np.random.default_rng(bloques).choice(np.arange(1, len(valores)), bloques - 1, replace=False))
+    partes = [{'Sales': AcumuladorEstadisticas(MODO_EXACTO).agregar(bloque)} for bloque in np.split(valores, cortes)]
+    acumulador = fusionar_acumuladores(*partes)['Sales']
+
+    serie = pd.Series(valores)
+    assert acumulador.n == len(serie)
+    assert acumulador.suma == pytest.approx(serie.sum(), rel=1e-12)
+    assert acumulador.media == pytest.approx(serie.mean(), rel=1e-12)
+    assert acumulador.varianza == pytest.approx(serie.var(), rel=1e-12)
+    assert acumulador.desviacion == pytest.approx(serie.std(), rel=1e-12)
+    assert acumulador.mediana == serie.median()
+    assert (acumulador.minimo, acumulador.maximo) == (serie.min(), serie.max())
+
+
+def test_chan_estable_con_desplazamiento_grande():
+    # La fórmula de la suma de cuadrados pierde toda la precisión con una media de 1e9
+    valores = 1e9 + np.random.default_rng(3).normal(size=10_000)
+    acumulador = AcumuladorEstadisticas(MODO_EXACTO)
+    for bloque in np.array_split(valores, 10):
+        acumulador.agregar(bloque)
+    assert acumulador.varianza == pytest.approx(pd.Series(valores).var(), rel=1e-6)
+
+
+def test_modo_auto_pasa_al_sketch(valores):
+    acumulador = AcumuladorEstadisticas(MODO_AUTO, limite_exacto=5_000)
+    for bloque in np.array_split(valores, 8):
+        acumulador.agregar(bloque)
+    aproximado = AcumuladorEstadisticas(MODO_APROXIMADO).agregar(valores)
+
+    assert not acumulador.exacto
+    central = np.sort(valores)[(len(valores) - 1) // 2]
+    assert abs(acumulador.mediana - central) <= 0.005 * abs(central) * (1 + 1e-9)
+    assert acumulador.mediana == aproximado.mediana
+    assert acumulador.varianza == pytest.approx(pd.Series(valores).var(), rel=1e-12)
+
+
+def test_copia_independiente(valores):
+    original = AcumuladorEstadisticas(MODO_EXACTO).agregar(valores[:100])
+    copia = original.copia().agregar(valores[100:200])
+    assert original.n == 100 and copia.n == 200
+    assert original.mediana == np.median(valores[:100])
+
+
+def _comparar_con_pandas(acumulador, serie, error_relativo=None):
+    assert acumulador.n == serie.count()
+    assert acumulador.suma == pytest.approx(serie.sum(), rel=1e-9)
+    assert acumulador.media == pytest.approx(serie.mean(), rel=1e-9)
+    assert acumulador.varianza == pytest.approx(serie.var(), rel=1e-9)
+    assert (acumulador.minimo, acumulador.maximo) == (serie.min(), serie.max())
+    if error_relativo is None:
+        assert acumulador.mediana == serie.median()
+    else:
+        central = np.sort(serie.dropna().to_numpy())[(serie.count() - 1) // 2]
+        assert abs(acumulador.mediana - central) <= error_relativo * abs(central) * (1 + 1e-9)
+
+
+@pytest.mark.parametrize('modo', [MODO_EXACTO, MODO_APROXIMADO])
+def test_csv_por_bloques_igual_a_pandas(datos, tmp_path, modo):
+    # El CSV se lee en bloques chicos, sólo con las columnas pedidas
+    ruta = tmp_path / 'pedidos.csv'
+    datos.to_csv(ruta, index=False)
+    acumuladores = acumular_csv(ruta, ['Sales', 'Profit'], modo, tamano_bloque=500)
+    for columna in ('Sales', 'Profit'):
+        _comparar_con_pandas(acumuladores[columna], datos[columna], None if modo == MODO_EXACTO else 0.005)
+    if modo == MODO_APROXIMADO:
+        ordenados = np.sort(datos['Sales'].to_numpy())
+        for q in (0.01, 0.25, 0.75, 0.99):
+            exacto = ordenados[int(np.floor(q * (len(ordenados) - 1)))]
+            assert abs(acumuladores['Sales'].sketch.cuantil(q) - exacto) <= 0.005 * abs(exacto) * (1 + 1e-9)
+
+
+def test_archivos_fusionados_igual_a_pandas(datos, tmp_path):
+    # Varias exportaciones leídas por separado en modo 'auto' y fusionadas
+    rutas = []
+    for numero, parte in enumerate(np.array_split(np.arange(len(datos)), 3)):
+        rutas.append(tmp_path / f'parte{numero}.csv')
+        datos.iloc[parte].to_csv(rutas[-1], index=False)
+    acumuladores = acumular_archivos(rutas, ['Sales', 'Profit'], tamano_bloque=1000)
+    for columna in ('Sales', 'Profit'):
+        _comparar_con_pandas(acumuladores[columna], datos[columna])
+
+    tabla = tabla_estadisticas(acumuladores).set_index('Categoria')
+    assert tabla.loc['Sales', 'Desviación Estándar'] == pytest.approx(datos['Sales'].std(), rel=1e-9)
+    assert tabla.loc['Profit', 'Mediana'] == datos['Profit'].median()
@@ -0,0 +1,59 @@
+# Pruebas de las variantes de imágenes: tamaño pedido, caché por archivo y regeneración al cambiar
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from empresa.imagenes import AlmacenImagenes
+
+
+def _guardar(ruta, ancho, alto, color, mtime):
+    Image.new('RGB', (ancho, alto), color).save(ruta)
+    os.utime(ruta, (mtime, mtime))
+
+
+def _abrir(contenido):
+    return Image.open(io.BytesIO(contenido))
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    ruta = str(tmp_path / 'imagen.png')
+    _guardar(ruta, 2000, 1000, (255, 0, 0), 1_000_000)
+    return ruta
+
+
+def test_variante_con_el_ancho_pedido(ruta):
+    almacen = AlmacenImagenes()
+    variante = _abrir(almacen.variante(ruta, 500))
+    assert variante.size == (500, 250)
+    assert variante.format == almacen.formato
+
+
+def test_no_agranda_imagenes_chicas(ruta):
+    assert _abrir(AlmacenImagenes().variante(ruta, 4000)).size == (2000, 1000)
+
+
+def test_variante_se_codifica_una_vez(ruta, monkeypatch):
+    almacen = AlmacenImagenes()
+    primera = almacen.variante(ruta, 500)
+    monkeypatch.setattr(almacen, '_codificar', lambda *argumentos: pytest.fail('se volvió a codificar'))
+    assert almacen.variante(ruta, 500) is primera
+
+
+def test_se_regenera_al_cambiar_el_archivo(ruta):
+    almacen = AlmacenImagenes()
+    vieja = almacen.variante(ruta, 500)
+    almacen.variante(ruta, 300)
+
+    _guardar(ruta, 1000, 1000, (0, 0, 255), 2_000_000)
+    nueva = almacen.variante(ruta, 500)
+
+    assert nueva != vieja
+    imagen = _abrir(nueva).convert('RGB')
+    assert imagen.size == (500, 500)
+    assert imagen.getpixel((250, 250))[2] > 200
+    # Las variantes de la versión anterior del archivo se descartan
+    assert all(clave[1] == os.path.getmtime(ruta) for clave in almacen._variantes)
+    assert almacen.original(ruta).size == (1000, 1000)
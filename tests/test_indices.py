@@ -0,0 +1,62 @@
+# Pruebas de los índices de productos y fechas: mismas filas y opciones que filtrar con pandas
+import numpy as np
+import pandas as pd
+import pytest
+
+from empresa.indices import IndiceFechas, IndiceProductos
+
+
+@pytest.fixture(scope='module')
+def indice(datos):
+    return IndiceProductos(datos['Product Name'])
+
+
+def test_opciones_son_los_productos_presentes(datos, indice):
+    assert indice.opciones == sorted(datos['Product Name'].unique().tolist())
+
+
+@pytest.mark.parametrize('cantidad', [1, 5, 60])
+def test_filas_igual_a_isin(datos, indice, cantidad):
+    nombres = indice.opciones[::7][:cantidad]
+    esperado = datos[datos['Product Name'].isin(nombres)]
+    filas = indice.filas(datos, nombres)
+
+    pd.testing.assert_frame_equal(filas, esperado)
+    assert indice.contar(nombres) == len(esperado)
+
+
+def test_sin_seleccion_y_nombres_desconocidos(datos, indice):
+    assert indice.filas(datos, []) is datos
+    assert indice.contar(['Producto que no existe']) == 0
+    assert len(indice.filas(datos, ['Producto que no existe'])) == 0
+    uno = indice.opciones[0]
+    assert indice.contar([uno, 'Producto que no existe']) == (datos['Product Name'] == uno).sum()
+
+
+def test_agregar_igual_a_construir(datos, indice):
+    # Un índice construido por partes da las mismas posiciones; el original no cambia
+    corte = len(datos) // 3
+    primero = IndiceProductos(datos['Product Name'].iloc[:corte])
+    opciones = list(primero.opciones)
+    agregado = primero.copia().agregar(datos['Product Name'].iloc[corte:], corte)
+
+    assert agregado.opciones == indice.opciones
+    for nombre in indice.opciones:
+        assert np.array_equal(agregado.posiciones_de([nombre]), indice.posiciones_de([nombre]))
+    assert primero.opciones == opciones
+    assert primero.contar(primero.opciones) == corte
+
+
+def test_fechas_igual_a_pandas(datos):
+    fechas = IndiceFechas(datos['Order Date'])
+    assert fechas.anios == sorted(datos['Order Date'].dt.year.unique().tolist())
+    assert fechas.meses == sorted(datos['Order Date'].dt.month.unique().tolist())
+    assert len(fechas.periodos) == datos['Order Date'].dt.to_period('M').nunique()
+
+
+def test_fechas_agregar(datos):
+    anteriores = datos[datos['Order Date'].dt.year < 2011]['Order Date']
+    fechas = IndiceFechas(anteriores)
+    agregado = fechas.copia().agregar(datos['Order Date'])
+    assert agregado.anios == IndiceFechas(datos['Order Date']).anios
+    assert max(fechas.anios) == 2010
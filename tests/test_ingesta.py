@@ -0,0 +1,140 @@
+# Pruebas de la ingesta incremental: deltas iguales a reconstruir, duplicados y versiones inmutables
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from empresa.cubo import DIMENSIONES, CuboVentas
+from empresa.ingesta import PROCESADOS, EstadoDatos, LoteInvalido, validar_lote
+from empresa.motores import MotorPandas
+from tests.comun import consultas, iguales
+
+
+@pytest.fixture
+def partes(crudo):
+    # Ocho de cada diez filas forman la carga inicial y el resto llega en cuatro lotes desordenados;
+    # el último lote trae un producto y una provincia nuevos con fechas anteriores a todas
+    base = crudo.sample(frac=0.8, random_state=1)
+    resto = crudo.drop(base.index).sample(frac=1, random_state=2)
+    lotes = [resto.iloc[inicio::4] for inicio in range(4)]
+    extra = lotes[0].head(20).copy()
+    extra['Row ID'] += 100_000
+    extra['Product Name'] = 'Producto Nuevo'
+    extra['Province'] = 'Provincia Nueva'
+    extra['Order Date'] = '01/02/2009'
+    return base, lotes + [extra]
+
+
+def _ordenado(resultado, por):
+    return resultado.sort_values(por).reset_index(drop=True)
+
+
+def test_cubo_por_lotes_igual_a_reconstruir(partes):
+    base, lotes = partes
+    cubo = CuboVentas.desde_df(validar_lote(base))
+    compactaciones = 0
+    for lote in lotes:
+        cubo = cubo.copia().agregar(validar_lote(lote))
+        compactaciones += cubo.pendientes == 0
+    reconstruido = CuboVentas.desde_df(validar_lote(pd.concat([base] + lotes)))
+
+    assert compactaciones
+    assert cubo.rangos == reconstruido.rangos
+    for por in (['Year', 'Month'], ['Region', 'Province'], ['Product Name'], ['Ship Mode', 'Customer Segment']):
+        assert iguales(cubo.consultar(por), reconstruido.consultar(por))
+    filtros = {'Year': 2012, 'Province': ['Ontario', 'Provincia Nueva']}
+    assert iguales(cubo.consultar('Product Name', filtros=filtros), reconstruido.consultar('Product Name', filtros=filtros))
+
+    # Compactado, el cubo tiene exactamente las celdas de uno construido de una vez
+    cubo.compactar()
+    assert len(cubo) == len(reconstruido)
+    assert iguales(_ordenado(cubo.celdas, DIMENSIONES), _ordenado(reconstruido.celdas, DIMENSIONES))
+
+
+def test_consultas_por_lotes_iguales_a_reconstruir(partes):
+    base, lotes = partes
+    estado = EstadoDatos(validar_lote(base))
+    for lote in lotes:
+        estado.agregar_lote(lote)
+    ingerido = MotorPandas(estado)
+    reconstruido = MotorPandas(EstadoDatos(validar_lote(pd.concat([base] + lotes))))
+
+    productos = list(reconstruido.consultar('opciones_productos'))
+    for nombre, argumentos in consultas(['Producto Nuevo'] + productos):
+        assert iguales(ingerido.consultar(nombre, *argumentos), reconstruido.consultar(nombre, *argumentos)), nombre
+
+
+def test_lotes_repetidos_no_se_cuentan_dos_veces(partes):
+    base, lotes = partes
+    estado = EstadoDatos(validar_lote(base))
+    ventas = estado.actual.cubo.consultar([])['Sales']
+
+    assert estado.agregar_lote(lotes[0]) == {'filas': len(lotes[0]), 'nuevas': len(lotes[0]), 'duplicadas': 0}
+    assert estado.agregar_lote(lotes[0]) == {'filas': len(lotes[0]), 'nuevas': 0, 'duplicadas': len(lotes[0])}
+    assert estado.version == 1
+
+    # Filas repetidas dentro del lote y filas que ya estaban en la carga inicial
+    mezcla = pd.concat([lotes[1], lotes[1].head(5), base.head(7)])
+    assert estado.agregar_lote(mezcla) == {'filas': len(mezcla), 'nuevas': len(lotes[1]), 'duplicadas': 12}
+    assert len(estado.actual) == len(base) + len(lotes[0]) + len(lotes[1])
+    assert estado.actual.cubo.consultar([])['Sales'] == pytest.approx(ventas + lotes[0]['Sales'].sum() + lotes[1]['Sales'].sum())
+
+
+def test_clave_es_el_par_completo(crudo):
+    # Mismo Row ID con otro Order ID (y al revés) es otro pedido, aunque los valores sean grandes
+    base = crudo.head(50).copy()
+    base['Row ID'] = np.arange(50) + (1 << 32)
+    estado = EstadoDatos(validar_lote(base))
+    lote = base.head(2).copy()
+    lote['Order ID'] += 1
+    lote.iloc[1, lote.columns.get_loc('Row ID')] = 1
+    assert estado.agregar_lote(lote)['nuevas'] == 2
+    assert estado.agregar_lote(lote)['nuevas'] == 0
+
+
+def test_versiones_publicadas_no_cambian(partes):
+    base, lotes = partes
+    estado = EstadoDatos(validar_lote(base))
+    anterior = estado.actual
+    filas, ventas = len(anterior), anterior.cubo.consultar([])['Sales']
+    anios = list(anterior.indice_fechas.anios)
+    clientes = anterior.clientes.contar()
+    opciones = list(anterior.indice_productos.opciones)
+
+    estado.agregar_lote(lotes[-1])
+    estado.agregar_lote(lotes[0])
+
+    assert estado.actual is not anterior and estado.actual.version == anterior.version + 2
+    assert (len(anterior), anterior.cubo.consultar([])['Sales']) == (filas, ventas)
+    assert list(anterior.indice_fechas.anios) == anios
+    assert anterior.clientes.contar() == clientes
+    assert list(anterior.indice_productos.opciones) == opciones
+    assert 'Provincia Nueva' not in set(anterior.datos.vista(['Province'])['Province'])
+    with pytest.raises(AttributeError):
+        anterior.cubo = None
+
+
+def test_lote_invalido_no_publica_version(crudo):
+    estado = EstadoDatos(validar_lote(crudo.head(100)))
+    with pytest.raises(LoteInvalido):
+        estado.agregar_lote(crudo.drop(columns=['Sales']).head(10))
+    assert estado.version == 0
+
+
+def test_desde_csv_aplica_procesados_una_vez(crudo, tmp_path):
+    # Reiniciar con lotes procesados (uno de ellos repetido) da lo mismo que cargarlos una vez
+    extra = crudo.head(30).copy()
+    extra['Row ID'] += 100_000
+    ruta = tmp_path / 'Empresa.CSV'
+    crudo.to_csv(ruta, index=False)
+    procesados = tmp_path / 'entradas' / PROCESADOS
+    os.makedirs(procesados)
+    extra.to_csv(procesados / '20240101-000000_a.csv', index=False)
+    shutil.copy(procesados / '20240101-000000_a.csv', procesados / '20240101-000001_b.csv')
+
+    estado = EstadoDatos.desde_csv(str(ruta), str(tmp_path / 'entradas'))
+    assert estado.version == 1
+    assert len(estado.actual) == len(crudo) + len(extra)
+    assert estado.actual.cubo.consultar([])['Sales'] == pytest.approx(crudo['Sales'].sum() + extra['Sales'].sum())
@@ -0,0 +1,126 @@
+# Pruebas de los motores de consulta: pandas, SQLite y la instantánea dan los mismos resultados
+import shutil
+import threading
+
+import pandas as pd
+import pytest
+
+from empresa.carga import normalizar
+from empresa.instantanea import DEFECTO, FuenteDatos, Instantanea, escribir_instantanea
+from empresa.motores import MotorPandas, MotorSQLite
+from tests.comun import RUTA_CSV, consultas, iguales
+
+
+@pytest.fixture(scope='module')
+def ruta_csv(tmp_path_factory):
+    # Copia de Empresa.CSV en un directorio temporal, para que el sidecar, la base y la instantánea
+    # no se escriban junto al CSV del repositorio
+    ruta = tmp_path_factory.mktemp('datos') / 'Empresa.CSV'
+    shutil.copy(RUTA_CSV, ruta)
+    return str(ruta)
+
+
+@pytest.fixture(scope='module')
+def motores(ruta_csv):
+    return MotorPandas.desde_csv(ruta_csv), MotorSQLite.desde_csv(ruta_csv)
+
+
+@pytest.fixture
+def lote(crudo):
+    # Pedidos nuevos con un producto nuevo, más algunas filas ya cargadas
+    nuevos = crudo.sample(300, random_state=5)
+    nuevos['Row ID'] += 100_000
+    nuevos.iloc[:10, nuevos.columns.get_loc('Product Name')] = 'Producto Nuevo'
+    return pd.concat([nuevos, crudo.head(20)])
+
+
+def test_mismos_resultados_en_pandas_y_sqlite(motores):
+    pandas, sqlite = motores
+    productos = list(pandas.consultar('opciones_productos'))
+    for nombre, argumentos in consultas(productos):
+        assert iguales(pandas.consultar(nombre, *argumentos), sqlite.consultar(nombre, *argumentos)), nombre
+
+
+def test_resultados_como_pandas_directo(motores, crudo):
+    # Algunas consultas recalculadas a mano sobre el CSV
+    df = normalizar(crudo)
+    for motor in motores:
+        assert motor.consultar('filas') == len(df)
+        ventas, ganancias = motor.consultar('total_fechas', None, None)
+        assert (ventas, ganancias) == (pytest.approx(df['Sales'].sum()), pytest.approx(df['Profit'].sum()))
+        assert motor.consultar('clientes_por_region')[1] == df['Customer Name'].nunique()
+        regiones, _ = motor.consultar('totales_region_provincia', 100, 5000)
+        esperado = df[df['Sales'].between(100, 5000)].groupby('Region', observed=True)['Sales'].sum()
+        assert regiones.set_index('Region')['Sales'].to_dict() == pytest.approx(esperado.to_dict())
+
+
+def test_mismos_resultados_despues_de_un_lote(ruta_csv, lote, tmp_path):
+    pandas = MotorPandas.desde_csv(ruta_csv)
+    sqlite = MotorSQLite.desde_csv(ruta_csv, ruta=str(tmp_path / 'lotes.sqlite'))
+    assert pandas.estado.agregar_lote(lote) == sqlite.agregar_lote(lote) == {'filas': 320, 'nuevas': 300, 'duplicadas': 20}
+    assert pandas.version == sqlite.version == 1
+
+    productos = ['Producto Nuevo'] + list(pandas.consultar('opciones_productos'))
+    for nombre, argumentos in consultas(productos):
+        assert iguales(pandas.consultar(nombre, *argumentos), sqlite.consultar(nombre, *argumentos)), nombre
+
+
+def test_sqlite_guarda_resultados_por_version(ruta_csv, lote, tmp_path, monkeypatch):
+    # Las consultas de toda la tabla se repiten sin ir a la base y se recalculan al agregar un lote
+    pandas = MotorPandas.desde_csv(ruta_csv)
+    sqlite = MotorSQLite.desde_csv(ruta_csv, ruta=str(tmp_path / 'resultados.sqlite'))
+    productos = tuple(sqlite.consultar('opciones_productos')[:3]) + ('Producto Nuevo',)
+    nombres = [('filas', ()), ('opciones_productos', ()), ('opciones_fechas', ()), ('estadisticas', ()),
+               ('filas_productos', (productos,))]
+    antes = [sqlite.consultar(nombre, *argumentos) for nombre, argumentos in nombres]
+    with monkeypatch.context() as parche:
+        parche.setattr(sqlite, '_conexion', lambda: pytest.fail('se volvió a consultar la base'))
+        for (nombre, argumentos), resultado in zip(nombres, antes):
+            assert sqlite.consultar(nombre, *argumentos) is resultado
+
+    pandas.estado.agregar_lote(lote)
+    sqlite.agregar_lote(lote)
+    for nombre, argumentos in nombres:
+        assert iguales(pandas.consultar(nombre, *argumentos), sqlite.consultar(nombre, *argumentos)), nombre
+    assert sqlite.consultar('filas') == antes[0] + 300
+
+
+def test_instantanea_igual_a_los_motores(ruta_csv, motores):
+    escribir_instantanea(ruta_csv)
+    instantanea = Instantanea.leer(ruta_csv)
+    assert instantanea is not None
+    for nombre, argumentos in DEFECTO:
+        guardado = instantanea.obtener(nombre, argumentos)
+        for motor in motores:
+            assert iguales(guardado, motor.consultar(nombre, *argumentos)), nombre
+
+
+def test_instantanea_de_otro_csv_se_ignora(crudo, tmp_path):
+    ruta = tmp_path / 'Empresa.CSV'
+    crudo.to_csv(ruta, index=False)
+    escribir_instantanea(str(ruta))
+    crudo.iloc[1:].to_csv(ruta, index=False)
+    assert Instantanea.leer(str(ruta)) is None
+
+
+def test_fuente_cerrada_descarta_el_motor_en_segundo_plano(ruta_csv, monkeypatch):
+    # La fuente sale de la caché mientras el hilo construye el motor: al terminar no se guarda
+    escribir_instantanea(ruta_csv)
+    empezo, seguir, construidos = threading.Event(), threading.Event(), []
+
+    def crear_motor(*argumentos):
+        empezo.set()
+        seguir.wait(10)
+        construidos.append(object())
+        return construidos[-1]
+
+    monkeypatch.setattr('empresa.instantanea.crear_motor', crear_motor)
+    fuente = FuenteDatos(ruta_csv)
+    assert fuente.instantanea is not None
+    assert empezo.wait(10)
+    fuente.cerrar()
+    seguir.set()
+    with fuente._candado:
+        assert len(construidos) == 1 and fuente._motor is None
+    # La primera pantalla se sigue respondiendo desde la instantánea
+    assert fuente.consultar('filas') == len(normalizar(pd.read_csv(RUTA_CSV)))
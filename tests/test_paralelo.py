@@ -0,0 +1,81 @@
+# Pruebas de la agregación por particiones: mismos totales que un groupby de pandas, también al
+# anexar filas como segmentos nuevos y al repartir las particiones en el pool
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from empresa import paralelo
+from empresa.paralelo import POR_BLOQUES, AgregadorParalelo, AlmacenColumnas
+
+
+def _esperado(datos, dimension, medidas, rango=None):
+    if rango is not None:
+        medida, minimo, maximo = rango
+        datos = datos[datos[medida].between(minimo, maximo)]
+    esperado = datos.groupby(dimension, observed=True)[medidas].sum().reset_index()
+    esperado[dimension] = esperado[dimension].astype(object)
+    return esperado.sort_values(dimension, ignore_index=True)
+
+
+def _comparar(resultado, esperado):
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False)
+
+
+@pytest.mark.parametrize('dimension', ['Region', 'Product Name'])
+@pytest.mark.parametrize('rango', [None, ('Sales', 100.0, 5000.0)])
+def test_agregar_igual_a_groupby(datos, dimension, rango):
+    agregador = AgregadorParalelo(AlmacenColumnas.exportar(datos), trabajadores=1)
+    _comparar(agregador.agregar(dimension, ['Sales', 'Profit'], rango), _esperado(datos, dimension, ['Sales', 'Profit'], rango))
+    agregador.cerrar()
+
+
+def test_anexar_escribe_solo_las_filas_nuevas(datos):
+    # Lotes con categorías que no estaban en el primer segmento
+    anios = datos['Order Date'].dt.year
+    primero = datos[anios < 2011]
+    agregador = AgregadorParalelo(AlmacenColumnas.exportar(primero), trabajadores=1)
+    directorio = agregador.almacen.segmentos[0].directorio
+    for anio in (2011, 2012):
+        siguiente = agregador.anexar(datos[anios == anio])
+        assert siguiente.almacen.segmentos[0].directorio == directorio
+        agregador.cerrar()
+        agregador = siguiente
+
+    assert agregador.almacen.filas == len(datos)
+    assert len(agregador.almacen.segmentos) == 3
+    for dimension in ('Province', 'Product Name'):
+        _comparar(agregador.agregar(dimension, 'Sales'), _esperado(datos, dimension, ['Sales']))
+
+    # Los segmentos temporales se borran cuando los suelta la última versión que los usa
+    assert os.path.isdir(directorio)
+    agregador.cerrar()
+    assert not os.path.exists(directorio)
+
+
+def test_segmentos_se_unen(datos, monkeypatch):
+    monkeypatch.setattr(paralelo, 'MAXIMO_SEGMENTOS', 3)
+    bloques = np.array_split(np.arange(len(datos)), 5)
+    agregador = AgregadorParalelo(AlmacenColumnas.exportar(datos.iloc[bloques[0]]), trabajadores=1)
+    for bloque in bloques[1:]:
+        agregador = agregador.anexar(datos.iloc[bloque])
+    assert len(agregador.almacen.segmentos) <= 3
+    _comparar(agregador.agregar('Ship Mode', ['Sales', 'Order Quantity']), _esperado(datos, 'Ship Mode', ['Sales', 'Order Quantity']))
+
+
+def test_pool_igual_al_proceso_actual(datos, monkeypatch):
+    monkeypatch.setattr(paralelo, 'MINIMO_FILAS_POOL', 0)
+    almacen = AlmacenColumnas.exportar(datos)
+    en_pool = AgregadorParalelo(almacen, trabajadores=2, particiones=4, por=POR_BLOQUES)
+    _comparar(en_pool.agregar('Region', ['Sales', 'Profit']), _esperado(datos, 'Region', ['Sales', 'Profit']))
+    # Otro agregador con la misma cantidad de trabajadores usa el mismo pool
+    assert paralelo.ejecutor(2) is paralelo.ejecutor(2)
+    almacen.cerrar()
+
+
+def test_trabajadores_por_defecto(monkeypatch):
+    monkeypatch.delenv(paralelo.VARIABLE_TRABAJADORES, raising=False)
+    assert paralelo.configuracion()[0] == (os.cpu_count() or 1)
+    monkeypatch.setenv(paralelo.VARIABLE_TRABAJADORES, '1')
+    assert paralelo.configuracion()[0] == 1
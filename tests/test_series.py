@@ -0,0 +1,92 @@
+# Pruebas de las series materializadas: totales y series iguales a un groupby de pandas
+import numpy as np
+import pandas as pd
+import pytest
+
+from empresa.series import DIARIA, INTERANUAL, MEDIA_MOVIL, MENSUAL, SEMANAL, VALOR, SeriesTemporales
+
+
+@pytest.fixture(scope='module')
+def series(datos):
+    return SeriesTemporales.desde_df(datos)
+
+
+def _filtro(datos, anio, mes):
+    fechas = datos['Order Date']
+    mascara = np.ones(len(datos), dtype=bool)
+    if anio is not None:
+        mascara &= fechas.dt.year == anio
+    if mes is not None:
+        mascara &= fechas.dt.month == mes
+    return datos[mascara]
+
+
+@pytest.mark.parametrize('anio', [None, 2009, 2012, 2030])
+@pytest.mark.parametrize('mes', [None, 1, 7, 12])
+def test_total_igual_a_groupby(datos, series, anio, mes):
+    for medida in ('Sales', 'Profit'):
+        assert series.total(medida, anio, mes) == pytest.approx(_filtro(datos, anio, mes)[medida].sum(), abs=1e-6)
+
+
+def test_ventanas_son_rebanadas_contiguas(datos, series):
+    dias = series.dias
+    assert series.ventanas() == [(0, len(series))]
+    for anio in datos['Order Date'].dt.year.unique():
+        (inicio, fin), = series.ventanas(anio)
+        assert (dias[inicio:fin].astype('datetime64[Y]').astype(int) + 1970 == anio).all()
+    # Un mes sin año da una rebanada por año
+    assert len(series.ventanas(None, 3)) == datos['Order Date'].dt.year.nunique()
+    assert series.ventanas(1990) == []
+
+
+def test_serie_diaria_igual_a_groupby(datos, series):
+    diaria = series.serie(DIARIA, VALOR)
+    esperado = datos.groupby(datos['Order Date'].dt.normalize())['Sales'].sum()
+    con_pedidos = diaria.set_index('Order Date').loc[esperado.index, 'Sales']
+    assert np.allclose(con_pedidos.to_numpy(), esperado.to_numpy())
+    # Los días sin pedidos del calendario valen cero
+    assert diaria['Sales'].sum() == pytest.approx(datos['Sales'].sum())
+    assert len(diaria) == (datos['Order Date'].max() - datos['Order Date'].min()).days + 1
+
+
+def test_serie_mensual_y_semanal_igual_a_groupby(datos, series):
+    mensual = series.serie(MENSUAL, VALOR)
+    esperado = datos.groupby(datos['Order Date'].dt.to_period('M'))['Profit'].sum()
+    assert np.allclose(mensual['Profit'].to_numpy(), esperado.reindex(pd.period_range(esperado.index[0], esperado.index[-1]), fill_value=0).to_numpy())
+
+    semanal = series.serie(SEMANAL, VALOR)
+    semanas = datos['Order Date'].dt.to_period('W-SUN').dt.start_time
+    esperado = datos.groupby(semanas)['Sales'].sum()
+    assert (semanal['Order Date'].dt.dayofweek == 0).all()
+    assert np.allclose(semanal.set_index('Order Date').loc[esperado.index, 'Sales'].to_numpy(), esperado.to_numpy())
+
+
+def test_indicadores_igual_a_rolling_y_shift(series):
+    valores = series.serie(MENSUAL, VALOR)['Sales']
+    media = series.serie(MENSUAL, MEDIA_MOVIL)['Sales']
+    interanual = series.serie(MENSUAL, INTERANUAL)['Sales']
+    assert np.allclose(media.to_numpy(), valores.rolling(3, min_periods=1).mean().to_numpy())
+    assert np.allclose(interanual.to_numpy(), (valores - valores.shift(12)).to_numpy(), equal_nan=True)
+
+
+def test_serie_filtrada(datos, series):
+    mensual = series.serie(MENSUAL, VALOR, 2011)
+    assert len(mensual) == 12
+    assert mensual['Sales'].sum() == pytest.approx(_filtro(datos, 2011, None)['Sales'].sum())
+
+
+def test_agregar_por_lotes_igual_a_construir(datos, series):
+    # Lotes fuera de orden que extienden el calendario hacia atrás y hacia adelante
+    medio = datos[datos['Order Date'].dt.year.isin([2010, 2011])]
+    por_lotes = SeriesTemporales.desde_df(medio)
+    por_lotes.agregar(datos[datos['Order Date'].dt.year == 2012]).agregar(datos[datos['Order Date'].dt.year == 2009])
+    assert por_lotes.inicio == series.inicio and len(por_lotes) == len(series)
+    assert np.allclose(por_lotes.acumuladas['Sales'], series.acumuladas['Sales'])
+    assert np.array_equal(por_lotes.pedidos, series.pedidos)
+
+
+def test_mejores_dias(datos, series):
+    mejores = series.mejores_dias('Sales', 5, 2010)
+    esperado = _filtro(datos, 2010, None).groupby(datos['Order Date'].dt.normalize())['Sales'].sum().nlargest(5)
+    assert np.allclose(mejores['Sales'].to_numpy(), esperado.to_numpy())
+    assert list(mejores['Order Date']) == list(esperado.index)
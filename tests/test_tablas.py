@@ -0,0 +1,46 @@
+# Pruebas del renderizado de tablas: el camino vectorizado muestra lo mismo que Styler
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from empresa.tablas import EstiloTabla
+
+
+def _celdas(contenido):
+    return re.findall(r'<td[^>]*>(.*?)</td>', contenido)
+
+
+@pytest.fixture
+def df():
+    # Tipos con y sin valores faltantes, como los que producen las secciones
+    return pd.DataFrame({
+        'Enteros': pd.array([3, None, 5], dtype='Int64'),
+        'Flotantes': [1.5, np.nan, -2.0],
+        'Nulables': pd.array([2.25, None, 1.0], dtype='Float64'),
+        'Textos': pd.array(['a', None, 'b'], dtype='string'),
+        'Cantidades': np.array([7, 8, 1]),
+        'Simples': np.array([1.1, 2.0, 3.0], dtype='float32'),
+    }, index=pd.Index(['Norte', 'Sur', 'Este'], name='Región'))
+
+
+@pytest.mark.parametrize('formatos', [None, {'Flotantes': '{:,.0f}', 'Enteros': '{:,}'}])
+def test_textos_como_styler(df, formatos):
+    estilo = EstiloTabla(barras=['Flotantes', 'Enteros'], formatos=formatos)
+    assert _celdas(estilo.html_vectorizado(df)) == _celdas(estilo.html_styler(df))
+
+
+def test_maximo_por_columna(df):
+    # Se resalta la misma celda que Styler.highlight_max, ignorando los faltantes
+    contenido = EstiloTabla().html_vectorizado(df)
+    maximos = re.findall(r'<td[^>]*class="maximo"[^>]*>(.*?)</td>', contenido)
+    assert maximos == ['1.500000', '2.250000', '8', '5', '3.000000']
+
+
+def test_cache_por_contenido(df):
+    estilo = EstiloTabla(barras=['Flotantes'])
+    primero = estilo.html(df)
+    assert estilo.html(df.copy()) is primero
+    otro = df.assign(Flotantes=df['Flotantes'] + 1)
+    assert estilo.html(otro) is not primero